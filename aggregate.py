@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import aggregate
+import sys
+import os
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Aggregate queries over several gem5 logs.')
+    parser.add_argument('fun', metavar='FUN', type=str, nargs='+',
+                        help='Function to evaluate')
+    parser.add_argument('--logs', metavar='LOG', type=str, nargs='+',
+                        required=True,
+                        help='Log files (e.g., one per seed)')
+    parser.add_argument('--fs', metavar='C', type=str,
+                        default=":",
+                        help='Field separator')
+
+    parser.add_argument("--confidence", metavar="P", type=float, default=0.95,
+                        choices=(0.90, 0.95, 0.99),
+                        help="Confidence level of the confidence interval")
+
+    parser.add_argument("--jobs", "-j", metavar="N", type=int, default=None,
+                        help="Number of worker processes")
+
+    parser.add_argument("--start", metavar="NUM", type=int, default=0,
+                        help="Skip the first NUM entries")
+
+    parser.add_argument("--stop", metavar="NUM", type=int, default=None,
+                        help="Stop after NUM entries")
+
+    parser.add_argument("--step", metavar="N", type=int, default=1,
+                        help="Use every N windows")
+
+    args = parser.parse_args()
+
+    for no, fun in enumerate(args.fun):
+        print "# %i: %s (mean, stddev, ci)" % (no, fun)
+
+    for stats in aggregate.aggregate(args.logs, args.fun, jobs=args.jobs,
+                                     start=args.start, stop=args.stop,
+                                     step=args.step):
+        out = []
+        for s in stats:
+            out += [ s.mean, s.stddev(), s.ci(args.confidence) ]
+        print args.fs.join([ str(s) for s in out ])
+
+if __name__ == "__main__":
+    main()
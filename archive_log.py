@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import log
+from gem5stats import archive
+import sys
+import os
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert a gem5 log to a compressed stats archive.')
+    parser.add_argument('log', metavar='LOG', type=argparse.FileType('r'),
+                        help='Log file')
+    parser.add_argument('out', metavar='OUT', type=argparse.FileType('wb'),
+                        help='Archive file')
+
+    parser.add_argument("--keyframe", metavar="NUM", type=int, default=64,
+                        help="Store a full dump every NUM dumps")
+
+    parser.add_argument("--codec", choices=("zlib", "bz2", "none"),
+                        default="zlib",
+                        help="Compression codec")
+
+    args = parser.parse_args()
+
+    dumps = archive.convert(log.stream_log(args.log), args.out,
+                            keyframe_interval=args.keyframe,
+                            codec=args.codec)
+    args.out.close()
+    print "%i dumps, %i bytes -> %i bytes" % (
+        dumps, os.path.getsize(args.log.name), os.path.getsize(args.out.name))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import diff
+from gem5stats import archive
+import sys
+import os
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two gem5 logs.')
+    parser.add_argument('log_a', metavar='BASE', type=argparse.FileType('r'),
+                        help='Baseline log file')
+    parser.add_argument('log_b', metavar='LOG', type=argparse.FileType('r'),
+                        help='Log file to compare against the baseline')
+    parser.add_argument('keys', metavar='KEY', type=str, nargs='+',
+                        help='Stat to compare (wildcards allowed)')
+    parser.add_argument('--fs', metavar='C', type=str,
+                        default=":",
+                        help='Field separator')
+
+    parser.add_argument("--align", choices=("index", "ticks"),
+                        default="index",
+                        help="Pair dumps by index or by nearest tick count")
+
+    parser.add_argument("--tick-key", metavar="KEY", type=str,
+                        default="final_tick",
+                        help="Cumulative stat used to align dumps by ticks")
+
+    parser.add_argument("--threshold", metavar="R", type=float, default=None,
+                        help="Only report stats with a relative difference "
+                        "larger than R (e.g., 0.05 for 5%%)")
+
+    parser.add_argument("--abs-threshold", metavar="D", type=float,
+                        default=None,
+                        help="Only report stats with an absolute difference "
+                        "larger than D")
+
+    args = parser.parse_args()
+
+    print "# dump%skey%sbase%slog%sabs%srel" % ((args.fs, ) * 5)
+
+    for d in diff.stream_diff(archive.open_stream(args.log_a),
+                              archive.open_stream(args.log_b),
+                              args.keys,
+                              align=args.align, tick_key=args.tick_key,
+                              threshold=args.threshold,
+                              abs_threshold=args.abs_threshold):
+        print args.fs.join([ str(s) for s in d ])
+
+if __name__ == "__main__":
+    main()
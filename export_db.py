@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import sqlstore
+from gem5stats import archive
+import sys
+import os
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export gem5 logs to a stats database.')
+    parser.add_argument('db', metavar='DB', type=str,
+                        help='Database file')
+    parser.add_argument('logs', metavar='LOG', type=str, nargs='+',
+                        help='Log file')
+    parser.add_argument('--name', metavar='NAME', type=str, default=None,
+                        help='Run name (defaults to the log file name). '
+                        'Only valid when exporting a single log.')
+
+    parser.add_argument("--batch", metavar="NUM", type=int, default=16,
+                        help="Number of dumps per transaction")
+
+    args = parser.parse_args()
+
+    if args.name and len(args.logs) != 1:
+        parser.error("--name can only be used with a single log")
+
+    exporter = sqlstore.Exporter(sqlstore.connect(args.db),
+                                 batch_size=args.batch)
+    for name in args.logs:
+        run = args.name if args.name else name
+        dumps = exporter.export(run, archive.open_stream(open(name, "rb")))
+        print "%s: %i dumps" % (run, dumps)
+
+if __name__ == "__main__":
+    main()
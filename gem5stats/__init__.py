@@ -29,6 +29,16 @@
 # Authors: Andreas Sandberg
 
 __all__ = [
+    "aggregate",
+    "archive",
+    "checkpoint",
+    "diff",
+    "keyindex",
     "log",
     "logquery",
+    "parallel",
+    "rebin",
+    "resultcache",
+    "sampling",
+    "sqlstore",
 ]
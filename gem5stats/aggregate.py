@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import logquery
+from gem5stats import archive
+from gem5stats.util import BufferedISlice
+
+import itertools
+import math
+import multiprocessing
+
+# Two-sided critical values of Student's t-distribution for 1-30
+# degrees of freedom. Larger sample sizes use the normal
+# approximation.
+_t_table = {
+    0.90 : (6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833,
+            1.812, 1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734,
+            1.729, 1.725, 1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703,
+            1.701, 1.699, 1.697),
+    0.95 : (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262,
+            2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101,
+            2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052,
+            2.048, 2.045, 2.042),
+    0.99 : (63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250,
+            3.169, 3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878,
+            2.861, 2.845, 2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771,
+            2.763, 2.756, 2.750),
+}
+
+_z_table = {
+    0.90 : 1.645,
+    0.95 : 1.960,
+    0.99 : 2.576,
+}
+
+def t_critical(df, confidence=0.95):
+    """Return the two-sided critical value of Student's
+    t-distribution.
+
+    Arguments:
+      df -- Degrees of freedom.
+
+    Keyword Arguments:
+      confidence -- Confidence level (0.90, 0.95, or 0.99).
+    """
+    if confidence not in _t_table:
+        raise ValueError("Unsupported confidence level: %s" % confidence)
+
+    table = _t_table[confidence]
+    return table[df - 1] if df <= len(table) else _z_table[confidence]
+
+class RunningStats(object):
+    """Online mean and variance using Welford's algorithm.
+
+    Partial results computed on disjoint samples can be combined
+    using merge, which makes it possible to fold results from
+    parallel workers.
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        """Add a sample."""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other):
+        """Add all samples from another RunningStats object."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def variance(self):
+        """Return the sample variance."""
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    def stddev(self):
+        """Return the sample standard deviation."""
+        return math.sqrt(self.variance())
+
+    def ci(self, confidence=0.95):
+        """Return the half width of the confidence interval of the
+        mean."""
+        if self.count < 2:
+            return float("nan")
+        return t_critical(self.count - 1, confidence) * \
+            self.stddev() / math.sqrt(self.count)
+
+    def __getstate__(self):
+        return (self.count, self.mean, self.m2)
+
+    def __setstate__(self, state):
+        self.count, self.mean, self.m2 = state
+
+def _open_stream(path, start, stop, step):
+    return BufferedISlice(archive.open_stream(open(path, "rb")),
+                          start=start, stop=stop, step=step)
+
+def fold_logs(paths, exprs, start=0, stop=None, step=1):
+    """Evaluate queries on several logs in lockstep.
+
+    Generates one list of RunningStats (one per query) per dump. Each
+    log gets its own copy of the expression trees since they may
+    contain internal state. Generation stops when the shortest log
+    runs out of dumps.
+
+    Arguments:
+      paths -- List of log file names.
+      exprs -- List of query strings.
+
+    Keyword Arguments:
+      start, stop, step -- Slicing parameters, see BufferedISlice.
+    """
+
+    trees = [ [ logquery.eval_fun(e) for e in exprs ] for p in paths ]
+    streams = [ _open_stream(p, start, stop, step) for p in paths ]
+    for dumps in itertools.izip(*streams):
+        stats = [ RunningStats() for e in exprs ]
+        for dump, funs in zip(dumps, trees):
+            if isinstance(dump, tuple):
+                dump = dump[0]
+            for s, f in zip(stats, funs):
+                s.add(f(dump))
+        yield stats
+
+def _fold_worker(queue, paths, exprs, slice_args):
+    try:
+        for stats in fold_logs(paths, exprs, *slice_args):
+            queue.put(stats)
+        queue.put(None)
+    except Exception as e:
+        queue.put(e)
+
+def aggregate(paths, exprs, jobs=None, start=0, stop=None, step=1,
+              queue_size=64):
+    """Evaluate queries on several logs and aggregate the results.
+
+    Logs are distributed over a set of worker processes. Each worker
+    evaluates its logs in lockstep and sends one partial RunningStats
+    per query and dump to the parent, which merges them. Memory usage
+    is therefore independent of both the number of logs and the
+    length of the logs.
+
+    Generates one list of RunningStats (one per query) per dump.
+
+    Arguments:
+      paths -- List of log file names.
+      exprs -- List of query strings.
+
+    Keyword Arguments:
+      jobs -- Number of worker processes, defaults to the number of CPUs.
+      start, stop, step -- Slicing parameters, see BufferedISlice.
+      queue_size -- Maximum number of dumps a worker may run ahead.
+    """
+
+    slice_args = (start, stop, step)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    jobs = min(jobs, len(paths))
+
+    if jobs <= 1:
+        for stats in fold_logs(paths, exprs, *slice_args):
+            yield stats
+        return
+
+    workers = []
+    for i in range(jobs):
+        queue = multiprocessing.Queue(queue_size)
+        proc = multiprocessing.Process(
+            target=_fold_worker,
+            args=(queue, paths[i::jobs], exprs, slice_args))
+        proc.daemon = True
+        proc.start()
+        workers.append((proc, queue))
+
+    try:
+        while True:
+            total = None
+            for proc, queue in workers:
+                partial = queue.get()
+                if isinstance(partial, Exception):
+                    raise partial
+                elif partial is None:
+                    return
+                elif total is None:
+                    total = partial
+                else:
+                    for t, p in zip(total, partial):
+                        t.merge(p)
+            yield total
+    finally:
+        for proc, queue in workers:
+            proc.terminate()
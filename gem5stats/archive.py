@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import log
+from gem5stats.log import StatDumpBase, KeyTable
+
+import bz2
+import marshal
+import struct
+import zlib
+
+_magic = "G5STATAR"
+_version = 1
+
+_header = struct.Struct("<8sI8s")
+_trailer = struct.Struct("<Q8s")
+
+_codecs = {
+    "zlib" : (lambda s: zlib.compress(s, 6), zlib.decompress),
+    "bz2" : (lambda s: bz2.compress(s, 9), bz2.decompress),
+    "none" : (lambda s: s, lambda s: s),
+}
+
+class ArchiveError(Exception):
+    """The archive is invalid."""
+    pass
+
+def _is_int(value):
+    return isinstance(value, (int, long))
+
+def _parse(value):
+    """Convert integer stats to ints, leave all other values alone."""
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return value
+
+class ArchiveStatDump(StatDumpBase):
+    """Dump loaded from a stats archive.
+
+    Integer stats are returned as ints, all other stats are returned
+    as they appear in the stats file.
+
+    Attributes:
+      data -- Dictionary between stat keys and values.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def keys(self):
+        return self.data.keys()
+
+class ArchiveWriter(object):
+    """Write a delta encoded stats archive.
+
+    Dumps are grouped into blocks that are compressed
+    independently. The first dump in a block (a keyframe) is stored in
+    full, subsequent dumps only store the stats that changed since the
+    previous dump. Integer stats are stored as the difference from
+    their previous value. A table of all keys and an index of all
+    blocks is stored at the end of the file.
+
+    File layout:
+      header -- Magic, version, and codec name.
+      blocks -- Compressed blocks of dumps.
+      footer -- Compressed key table and block index.
+      trailer -- Offset of the footer and magic.
+    """
+
+    def __init__(self, f, keyframe_interval=64, codec="zlib"):
+        """Create a new archive.
+
+        Arguments:
+          f -- File object opened for binary writing.
+
+        Keyword Arguments:
+          keyframe_interval -- Number of dumps per block.
+          codec -- Compression codec (zlib, bz2, or none).
+        """
+        if codec not in _codecs:
+            raise ValueError("Unknown codec: %s" % codec)
+
+        self.f = f
+        self.keyframe_interval = keyframe_interval
+        self.codec = codec
+        self.compress = _codecs[codec][0]
+        self.key_table = KeyTable()
+        self.index = []
+        self.block = []
+        self.dumps = 0
+        self.state = {}
+        self.offset = _header.size
+
+        f.write(_header.pack(_magic, _version, codec))
+
+    def add(self, dump):
+        """Append a dump to the archive."""
+        if not self.block:
+            self.state = {}
+
+        prev = self.state
+        cur = {}
+        for key in dump.keys():
+            cur[self.key_table.intern(key)] = _parse(dump[key])
+
+        removed = sorted(k for k in prev if k not in cur)
+        ids = []
+        values = []
+        last_id = 0
+        for key_id in sorted(cur):
+            value = cur[key_id]
+            try:
+                old = prev[key_id]
+            except KeyError:
+                old = None
+            if old is not None and old == value and \
+                    type(old) == type(value):
+                continue
+
+            # Ids are stored as the distance from the previous id
+            ids.append(key_id - last_id)
+            last_id = key_id
+            values.append(value - old if _is_int(value) and _is_int(old)
+                          else value)
+
+        self.block.append((removed, ids, values))
+        self.state = cur
+        self.dumps += 1
+
+        if len(self.block) >= self.keyframe_interval:
+            self._flush()
+
+    def _flush(self):
+        if not self.block:
+            return
+
+        data = self.compress(marshal.dumps(self.block, 2))
+        self.f.write(data)
+        self.index.append((self.offset, len(data),
+                           self.dumps - len(self.block), len(self.block)))
+        self.offset += len(data)
+        self.block = []
+
+    def close(self):
+        """Write the remaining dumps and the footer. The underlying
+        file is not closed."""
+        self._flush()
+        footer = zlib.compress(
+            marshal.dumps((self.key_table.names, self.index), 2))
+        self.f.write(footer)
+        self.f.write(_trailer.pack(self.offset, _magic))
+        self.f.flush()
+
+def is_archive(f):
+    """Return True if a file object refers to a stats archive. The
+    file position is restored afterwards."""
+    pos = f.tell()
+    magic = f.read(len(_magic))
+    f.seek(pos)
+    return magic == _magic
+
+class ArchiveReader(object):
+    """Read dumps from a stats archive.
+
+    Attributes:
+      keys -- List of keys indexed by key id.
+      index -- List of (offset, length, first dump, dump count) tuples
+               describing the blocks in the archive.
+    """
+
+    def __init__(self, f):
+        """Open an archive.
+
+        Arguments:
+          f -- File object opened for binary reading.
+        """
+        self.f = f
+        f.seek(0)
+        magic, version, codec = _header.unpack(f.read(_header.size))
+        codec = codec.rstrip("\0")
+        if magic != _magic:
+            raise ArchiveError("Not a stats archive.")
+        if version != _version:
+            raise ArchiveError("Unsupported archive version: %i" % version)
+        if codec not in _codecs:
+            raise ArchiveError("Unknown codec: %s" % codec)
+        self.decompress = _codecs[codec][1]
+
+        f.seek(-_trailer.size, 2)
+        end = f.tell()
+        offset, magic = _trailer.unpack(f.read(_trailer.size))
+        if magic != _magic:
+            raise ArchiveError("Truncated stats archive.")
+
+        f.seek(offset)
+        self.keys, self.index = marshal.loads(
+            zlib.decompress(f.read(end - offset)))
+
+    def __len__(self):
+        return sum(b[3] for b in self.index)
+
+    def _read_block(self, no):
+        offset, length, first, count = self.index[no]
+        self.f.seek(offset)
+        return marshal.loads(self.decompress(self.f.read(length)))
+
+    def _decode(self, block, skip=0):
+        keys = self.keys
+        state = {}
+        for no, (removed, ids, values) in enumerate(block):
+            for key_id in removed:
+                del state[keys[key_id]]
+
+            key_id = 0
+            for gap, value in zip(ids, values):
+                key_id += gap
+                key = keys[key_id]
+                if _is_int(value):
+                    old = state.get(key)
+                    if _is_int(old):
+                        value += old
+                state[key] = value
+
+            if no >= skip:
+                yield ArchiveStatDump(dict(state))
+
+    def stream(self, start=0):
+        """Generate a stream of dumps.
+
+        Keyword Arguments:
+          start -- Number of the first dump to generate. Only the
+                   block containing the first dump is decoded before
+                   the stream starts.
+        """
+        for no, (offset, length, first, count) in enumerate(self.index):
+            if first + count <= start:
+                continue
+            for dump in self._decode(self._read_block(no),
+                                     max(start - first, 0)):
+                yield dump
+
+    def __getitem__(self, no):
+        """Return one dump from the archive."""
+        if no < 0:
+            no += len(self)
+        for dump in self.stream(no):
+            return dump
+        raise IndexError(no)
+
+def stream_archive(f, start=0):
+    """Generate a stream of dumps from a stats archive.
+
+    Arguments:
+      f -- File object opened for binary reading.
+
+    Keyword Arguments:
+      start -- Number of the first dump to generate.
+    """
+    return ArchiveReader(f).stream(start)
+
+def convert(log, f, **kwargs):
+    """Convert a stream of dumps into an archive.
+
+    Arguments:
+      log -- Stream of dumps (e.g., from log.stream_log).
+      f -- File object opened for binary writing.
+
+    Any keyword arguments are passed to ArchiveWriter.
+
+    Returns the number of dumps converted.
+    """
+    writer = ArchiveWriter(f, **kwargs)
+    for dump in log:
+        writer.add(dump)
+    writer.close()
+    return writer.dumps
+
+def open_stream(f, **kwargs):
+    """Generate a stream of dumps from a file that is either a stats
+    archive or a plain stats file.
+
+    Arguments:
+      f -- File object to read from.
+
+    Any keyword arguments are passed to log.stream_log when reading a
+    plain stats file.
+    """
+    if is_archive(f):
+        return stream_archive(f)
+    else:
+        return log.stream_log(f, **kwargs)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+import os
+import cPickle as pickle
+
+class CheckpointError(Exception):
+    """The checkpoint can't be used to resume the query."""
+    pass
+
+class Checkpoint(object):
+    """Saved state of a set of expression trees evaluated on a log.
+
+    A checkpoint contains the expression trees, including any internal
+    state (e.g., accumulators and sliding windows), the file offset
+    after the last dump that was evaluated, and the number of dumps
+    that have been consumed from the log. This makes it possible to
+    continue evaluating a query on a log that has grown since the last
+    evaluation without re-reading the old dumps.
+
+    Attributes:
+      funs -- List of expression trees.
+      queries -- Query strings the expression trees were created from.
+      offset -- File offset after the last dump that was consumed.
+      dumps -- Number of dumps consumed from the log.
+      last -- Results from the last evaluated dump.
+      tail -- Data preceding offset, used to detect replaced logs.
+    """
+
+    version = 2
+
+    # Number of bytes before the offset used to detect if the log has
+    # been replaced.
+    tail_size = 256
+
+    def __init__(self, funs, queries, offset=0, dumps=0, last=None,
+                 tail=""):
+        self.funs = funs
+        self.queries = list(queries) if queries is not None else None
+        self.offset = offset
+        self.dumps = dumps
+        self.last = last
+        self.tail = tail
+
+    def update(self, log, offset, dumps, last):
+        """Update the position in the log.
+
+        Arguments:
+          log -- Name of the log file.
+          offset -- File offset after the last dump that was consumed.
+          dumps -- Number of dumps consumed from the log.
+          last -- Results from the last evaluated dump.
+        """
+        self.offset = offset
+        self.dumps = dumps
+        self.last = last
+        self.tail = _read_tail(log, offset, self.tail_size)
+
+    def validate(self, log, queries):
+        """Check that the checkpoint can be used to resume a query.
+
+        Raises CheckpointError if the expressions don't match or the
+        log doesn't start with the data that has already been
+        evaluated.
+
+        Arguments:
+          log -- Name of the log file.
+          queries -- Query strings to evaluate.
+        """
+        # The string representation of an expression tree doesn't
+        # include all of its parameters (e.g., defaults), so compare
+        # the queries instead.
+        if self.queries != list(queries):
+            raise CheckpointError("Checkpoint was created for a different "
+                                  "set of queries.")
+
+        if os.path.getsize(log) < self.offset or \
+                _read_tail(log, self.offset, self.tail_size) != self.tail:
+            raise CheckpointError("Log file has been modified since the "
+                                  "checkpoint was created.")
+
+    def save(self, name):
+        """Atomically store the checkpoint in a file."""
+        tmp = "%s.tmp" % name
+        with open(tmp, "wb") as f:
+            pickle.dump((self.version, self.__dict__), f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, name)
+
+    @classmethod
+    def load(cls, name):
+        """Load a checkpoint from a file."""
+        with open(name, "rb") as f:
+            version, state = pickle.load(f)
+
+        if version != cls.version:
+            raise CheckpointError("Unsupported checkpoint version: %s" % \
+                                      version)
+
+        cp = cls(None, None)
+        cp.__dict__.update(state)
+        return cp
+
+def _read_tail(log, offset, size):
+    with open(log, "rb") as f:
+        start = max(offset - size, 0)
+        f.seek(start)
+        return f.read(offset - start)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+from gem5stats.util import KeyMatcher
+
+import itertools
+
+def align_index(stream_a, stream_b):
+    """Pair dumps from two streams by their index in the stream.
+
+    Stops when either stream runs out of dumps.
+    """
+    return itertools.izip(stream_a, stream_b)
+
+def align_ticks(stream_a, stream_b, tick_key="final_tick", max_distance=None):
+    """Pair every dump in stream_a with the dump in stream_b that has
+    the nearest tick count.
+
+    Both streams must be sorted by tick count, which means that
+    tick_key has to be a cumulative stat. Per-dump stats such as
+    sim_ticks restart when stats are reset. Only one dump of
+    lookahead is kept from stream_b, so memory usage is constant.
+
+    Arguments:
+      stream_a -- Stream of dumps to align against.
+      stream_b -- Stream of dumps to align.
+
+    Keyword Arguments:
+      tick_key -- Stat used to align dumps.
+      max_distance -- Don't pair dumps that are further apart than this.
+    """
+
+    stream_b = iter(stream_b)
+    try:
+        cur = stream_b.next()
+    except StopIteration:
+        return
+    nxt = next(stream_b, None)
+
+    for dump_a in stream_a:
+        ticks = dump_a.get_float(tick_key)
+        while nxt is not None and \
+                abs(nxt.get_float(tick_key) - ticks) <= \
+                abs(cur.get_float(tick_key) - ticks):
+            cur, nxt = nxt, next(stream_b, None)
+
+        if max_distance is not None and \
+                abs(cur.get_float(tick_key) - ticks) > max_distance:
+            continue
+
+        yield dump_a, cur
+
+def relative_diff(a, b):
+    """Return the difference between b and a relative to a."""
+    if a == 0:
+        return 0.0 if b == 0 else float("inf")
+    else:
+        return (b - a) / abs(a)
+
+def diff_dumps(dump_a, dump_b, keys, threshold=None, abs_threshold=None):
+    """Compare scalar statistics in two dumps.
+
+    Generates (key, a, b, abs_diff, rel_diff) tuples for all keys that
+    exist in both dumps. Non-scalar values are ignored. Values that
+    are both NaN (or the same infinity) are considered equal.
+
+    Arguments:
+      dump_a -- Baseline dump.
+      dump_b -- Dump to compare against the baseline.
+      keys -- List of keys or a KeyMatcher.
+
+    Keyword Arguments:
+      threshold -- Only report stats with a larger relative difference.
+      abs_threshold -- Only report stats with a larger absolute difference.
+    """
+
+    if isinstance(keys, KeyMatcher):
+        keys = keys.keys(dump_a)
+
+    for key in keys:
+        try:
+            a = dump_a.get_float(key)
+            b = dump_b.get_float(key)
+        except (KeyError, ValueError, TypeError):
+            continue
+
+        if a == b or (a != a and b != b):
+            # NaN - NaN and inf - inf would otherwise be NaN, which
+            # never compares below a threshold.
+            abs_diff, rel_diff = 0.0, 0.0
+        else:
+            abs_diff = b - a
+            rel_diff = relative_diff(a, b)
+
+        if threshold is not None and abs(rel_diff) <= threshold:
+            continue
+        if abs_threshold is not None and abs(abs_diff) <= abs_threshold:
+            continue
+
+        yield key, a, b, abs_diff, rel_diff
+
+def stream_diff(stream_a, stream_b, keys, align="index", tick_key="final_tick",
+                **kwargs):
+    """Compare two streams of dumps.
+
+    Generates (dump_no, key, a, b, abs_diff, rel_diff) tuples, where
+    dump_no is the index of the dump in stream_a. Both streams are
+    walked in lockstep, so memory usage is independent of the size of
+    the logs.
+
+    Arguments:
+      stream_a -- Baseline stream of dumps.
+      stream_b -- Stream of dumps to compare against the baseline.
+      keys -- List of keys or wildcards.
+
+    Keyword Arguments:
+      align -- 'index' to pair dumps by position or 'ticks' to pair
+               dumps by the nearest tick count.
+      tick_key -- Stat used to align dumps by ticks.
+
+    Any other keyword arguments are passed to diff_dumps.
+    """
+
+    matcher = KeyMatcher(keys)
+    if align == "index":
+        pairs = align_index(stream_a, stream_b)
+    elif align == "ticks":
+        pairs = align_ticks(stream_a, stream_b, tick_key=tick_key)
+    else:
+        raise ValueError("Unknown alignment: %s" % align)
+
+    for no, (dump_a, dump_b) in enumerate(pairs):
+        for d in diff_dumps(dump_a, dump_b, matcher, **kwargs):
+            yield (no, ) + d
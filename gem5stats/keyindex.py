@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import archive
+from gem5stats.util import fingerprint
+from gem5stats.log import _re_dump_begin, _re_dump_end
+
+import bisect
+import fnmatch
+import marshal
+import os
+import re
+
+_version = 1
+
+def _glob_prefix(pattern):
+    """Return the literal prefix of a shell-style wildcard."""
+    m = re.match(r"[^*?\[]*", pattern)
+    return m.group(0)
+
+def _scan_text(f, first_only):
+    """Generate the set of keys in every dump of a plain stats
+    file. Only the key of each line is extracted, which is a lot
+    cheaper than parsing the full dump. Like in log.stream_log, a
+    dump without an end marker is still being written and is
+    skipped."""
+    keys = None
+    for l in f:
+        if keys is None:
+            if _re_dump_begin.match(l):
+                keys = set()
+        elif _re_dump_end.match(l):
+            yield keys
+            if first_only:
+                return
+            keys = None
+        elif l[0] not in " \n-":
+            keys.add(l.split(None, 1)[0])
+
+def _scan_dumps(stream, first_only):
+    for dump in stream:
+        yield set(dump.keys())
+        if first_only:
+            return
+
+class KeyIndex(object):
+    """Sorted index of the stat keys in a log.
+
+    The index keeps a sorted list of all keys, which makes prefix
+    lookups a matter of two binary searches. For every key, the index
+    also stores the ranges of dumps where the key is present.
+
+    Attributes:
+      keys -- Sorted list of keys.
+      ranges -- List of (first, last) dump ranges, one list per key.
+      dumps -- Number of dumps scanned.
+      first_only -- True if only the first dump was scanned.
+    """
+
+    def __init__(self, keys=(), ranges=(), dumps=0, first_only=False):
+        self.keys = list(keys)
+        self.ranges = list(ranges)
+        self.dumps = dumps
+        self.first_only = first_only
+
+    @classmethod
+    def build(cls, f, first_only=False):
+        """Create an index from a stats file or archive.
+
+        Arguments:
+          f -- File object to scan.
+
+        Keyword Arguments:
+          first_only -- Only scan the first dump.
+        """
+        if archive.is_archive(f):
+            dumps = _scan_dumps(archive.stream_archive(f), first_only)
+        else:
+            dumps = _scan_text(f, first_only)
+
+        open_ranges = {}
+        closed = {}
+        no = -1
+        for no, keys in enumerate(dumps):
+            for key in keys:
+                if key not in open_ranges:
+                    open_ranges[key] = no
+            for key in [ k for k in open_ranges if k not in keys ]:
+                closed.setdefault(key, []).append((open_ranges.pop(key),
+                                                   no - 1))
+
+        for key, first in open_ranges.items():
+            closed.setdefault(key, []).append((first, no))
+
+        keys = sorted(closed)
+        return cls(keys, [ closed[k] for k in keys ], no + 1, first_only)
+
+    def save(self, name, fingerprint):
+        """Store the index in a file.
+
+        Arguments:
+          name -- File name of the index.
+          fingerprint -- Value identifying the version of the log.
+        """
+        tmp = "%s.tmp" % name
+        with open(tmp, "wb") as f:
+            marshal.dump((_version, fingerprint, self.keys, self.ranges,
+                          self.dumps, self.first_only), f, 2)
+        os.rename(tmp, name)
+
+    @classmethod
+    def load(cls, name, fingerprint=None):
+        """Load an index from a file. Returns None if the index is
+        invalid or doesn't match the fingerprint."""
+        try:
+            with open(name, "rb") as f:
+                version, fp, keys, ranges, dumps, first_only = \
+                    marshal.load(f)
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+
+        if version != _version or \
+                (fingerprint is not None and fp != fingerprint):
+            return None
+
+        return cls(keys, ranges, dumps, first_only)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def _prefix_range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        # All keys starting with prefix sort before prefix + a
+        # character larger than any character in a key.
+        hi = bisect.bisect_left(self.keys, prefix + "\xff", lo)
+        return lo, hi
+
+    def prefix(self, prefix):
+        """Return all keys starting with prefix."""
+        lo, hi = self._prefix_range(prefix)
+        return self.keys[lo:hi]
+
+    def glob(self, pattern):
+        """Return all keys matching a shell-style wildcard."""
+        lo, hi = self._prefix_range(_glob_prefix(pattern))
+        regex = re.compile(fnmatch.translate(pattern))
+        return [ k for k in self.keys[lo:hi] if regex.match(k) ]
+
+    def regex(self, pattern):
+        """Return all keys containing a match of a regular
+        expression."""
+        regex = re.compile(pattern)
+        return [ k for k in self.keys if regex.search(k) ]
+
+    def children(self, path):
+        """Return the names of the direct children of a SimObject path
+        (e.g., 'system.cpu3.dcache.'). Children that have children of
+        their own are returned with a trailing '.'."""
+        if path and not path.endswith("."):
+            path += "."
+
+        lo, hi = self._prefix_range(path)
+        children = set()
+        start = len(path)
+        for k in self.keys[lo:hi]:
+            end = k.find(".", start)
+            children.add(k[start:] if end == -1 else k[start:end + 1])
+
+        return sorted(children)
+
+    def dump_ranges(self, key):
+        """Return the list of (first, last) dump ranges where a key is
+        present. Raises KeyError if the key isn't in the index."""
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            raise KeyError(key)
+        return self.ranges[i]
+
+def cache_name(name):
+    """Return the name of the index cache for a log file."""
+    return "%s.keys" % name
+
+def open_index(name, first_only=False, cache=True):
+    """Return the key index of a log file.
+
+    A cached index next to the log file is used if it's up to
+    date. Otherwise, the log is scanned and the cache updated.
+
+    Arguments:
+      name -- Name of the log file.
+
+    Keyword Arguments:
+      first_only -- Only scan the first dump.
+      cache -- Load and store the index in a cache file.
+    """
+    fp = fingerprint(name)
+    if cache:
+        index = KeyIndex.load(cache_name(name), fp)
+        # A full index can always be used in place of one created
+        # from the first dump.
+        if index is not None and (first_only or not index.first_only):
+            return index
+
+    with open(name, "rb") as f:
+        index = KeyIndex.build(f, first_only=first_only)
+
+    if cache:
+        try:
+            index.save(cache_name(name), fp)
+        except (IOError, OSError):
+            pass
+
+    return index
@@ -30,10 +30,15 @@
 
 import sys
 import re
+import array
+import mmap
 
 _re_empty = re.compile("^\s*$")
 _re_dump_begin = re.compile("^---------- Begin Simulation Statistics ----------$")
 _re_dump_end = re.compile("^---------- End Simulation Statistics   ----------$")
+
+_dump_begin = "---------- Begin Simulation Statistics ----------\n"
+_dump_end = "\n---------- End Simulation Statistics   ----------"
                             
 
 
@@ -58,29 +63,36 @@ class StatFormatError(StatError):
   Failed on: "%s"
   %s""" % (self.line, self.msg)
 
+class _IncompleteDump(Exception):
+    """The log ended before the end marker of a dump. This happens
+    when reading the log of a simulation that is still running."""
+    pass
 
-class StatDump(object):
-    """Class representing one dump of gem5's statistics.
 
-    This class contains support routines for loading a block of gem5
-    statistics. Entries are stored in an internal
-    dictionary. Statistics entries that contain a vector of values are
-    represented as tuples.
+class StatDumpBase(object):
+    """Base class for objects representing one dump of gem5's
+    statistics.
 
-    Attributes:
-      data -- Dictionary between stat keys and values.
+    This class contains the support routines for parsing a block of
+    gem5 statistics. Derived classes decide how the parsed entries are
+    stored by overloading _store, __getitem__ and keys.
     """
 
+    __slots__ = ()
+
     _re_line = re.compile("^(?P<key>[^- ]\S*) +(?P<values>[^#]+)(?P<comment>#.*)?$")
 
-    def __init__(self, log):
+    def _load(self, log):
         """Load a statistics block from a file.
 
         Arguments:
           log -- File-like object to read from.
-        """
 
-        self.data = {}
+        Exceptions:
+          StatFormatError -- Raised if the block can not be parsed.
+          _IncompleteDump -- Raised if the file ends before the end
+                             of the block.
+        """
 
         for l in log:
             if _re_empty.match(l):
@@ -91,12 +103,13 @@ class StatDump(object):
                         l[:-1],
                         "Expected end of simulation statistics.")
                 else:
-                    break
+                    return
+
+        raise _IncompleteDump()
 
     def _read_line(self, line):
-        """Read one line of statistics and store the results in the
-        data member. Returns True if a line was matched, False
-        otherwise.
+        """Read one line of statistics and store the results using
+        _store. Returns True if a line was matched, False otherwise.
 
         Arguments:
           line -- String representing the line to parse.
@@ -108,16 +121,37 @@ class StatDump(object):
 
         key = match.group("key")
         values = match.group("values").split()
-        self.data[key] = values[0] if len(values) == 1 else tuple(values)
+        self._store(key, values[0] if len(values) == 1 else tuple(values))
         return True
 
+    def _store(self, key, value):
+        """Store a parsed statistics entry.
+
+        Arguments:
+          key -- Name of the statistics entry.
+          value -- String or tuple of strings from the stats file.
+        """
+        raise NotImplementedError()
+
     def __getitem__(self, key):
-        return self.data[key]
+        raise NotImplementedError()
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def keys(self):
+        """Return a list of the keys in the dump."""
+        raise NotImplementedError()
 
     def get(self, key, default=None):
         """Return one statistics entry from the dump.
 
-        The default behavior is to 
+        The default behavior is to raise a KeyError if the key can't
+        be found and no default has been provided.
 
         Arguments:
           key -- Key to look up.
@@ -140,21 +174,410 @@ class StatDump(object):
     def get_float(self, *args, **kwargs):
         return float(self.get(*args, **kwargs))
 
-def stream_log(log):
+class StatDump(StatDumpBase):
+    """Class representing one dump of gem5's statistics.
+
+    This class contains support routines for loading a block of gem5
+    statistics. Entries are stored in an internal
+    dictionary. Statistics entries that contain a vector of values are
+    represented as tuples.
+
+    Attributes:
+      data -- Dictionary between stat keys and values.
+    """
+
+    def __init__(self, log):
+        """Load a statistics block from a file.
+
+        Arguments:
+          log -- File-like object to read from.
+        """
+
+        self.data = {}
+        self._load(log)
+
+    def _store(self, key, value):
+        self.data[key] = value
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def keys(self):
+        return self.data.keys()
+
+def _field_format(token):
+    """Return the format of a field in a vector as a (decimals,
+    suffix) tuple, where decimals is -1 for integers."""
+    suffix = "%" if token.endswith("%") else ""
+    body = token[:-1] if suffix else token
+    dot = body.find(".")
+    return (len(body) - dot - 1 if dot != -1 else -1, suffix)
+
+def _format_field(value, fmt):
+    decimals, suffix = fmt
+    if decimals < 0:
+        return "%d%s" % (value, suffix)
+    else:
+        return "%.*f%s" % (decimals, value, suffix)
+
+def _parse_vector(value):
+    """Convert a vector to a tuple of field formats and a list of
+    numbers. Returns None if the vector can't be reproduced exactly
+    from the numbers."""
+    fmts = []
+    numbers = []
+    try:
+        for token in value:
+            fmt = _field_format(token)
+            number = float(token[:-1] if fmt[1] else token)
+            if _format_field(number, fmt) != token:
+                return None
+            fmts.append(fmt)
+            numbers.append(number)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+    return tuple(fmts), numbers
+
+class KeyTable(object):
+    """Table of interned stat keys shared between compact dumps.
+
+    Every key is assigned a small integer id the first time it is
+    seen. Dumps from the same log share one table, which means that
+    each key string is only stored once regardless of the number of
+    dumps. The table also stores the layout of vectors, which is
+    normally the same in every dump.
+
+    Attributes:
+      ids -- Dictionary between stat keys and key ids.
+      names -- List of stat keys indexed by key id.
+      layouts -- Dictionary between key ids of vectors and (offset,
+                 fmts) tuples, where offset is the position of the
+                 vector's fields in a dump's vector array and fmts
+                 the format of every field.
+      vector_size -- Number of vector fields allocated in total.
+    """
+
+    __slots__ = ("ids", "names", "layouts", "vector_size")
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.layouts = {}
+        self.vector_size = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, key):
+        """Return the id of a key, allocate a new id if the key hasn't
+        been seen before.
+
+        Arguments:
+          key -- Key to look up.
+        """
+        try:
+            return self.ids[key]
+        except KeyError:
+            key_id = len(self.names)
+            key = intern(key)
+            self.ids[key] = key_id
+            self.names.append(key)
+            return key_id
+
+    def lookup(self, key):
+        """Return the id of a key. Raises KeyError if the key hasn't
+        been seen before.
+
+        Arguments:
+          key -- Key to look up.
+        """
+        return self.ids[key]
+
+    def layout(self, key_id, fmts):
+        """Return the (offset, fmts) layout of a vector, allocate
+        space for the vector's fields if it hasn't been seen before.
+
+        Arguments:
+          key_id -- Key id of the vector.
+          fmts -- Field formats of the vector.
+        """
+        try:
+            return self.layouts[key_id]
+        except KeyError:
+            layout = self.layouts[key_id] = (self.vector_size, fmts)
+            self.vector_size += len(fmts)
+            return layout
+
+class CompactStatDump(StatDumpBase):
+    """Memory efficient representation of one dump of gem5's
+    statistics.
+
+    Keys are stored in a KeyTable that is shared between all dumps
+    from the same log. Scalar values are stored in a flat array of
+    doubles indexed by key id, with a parallel array of type codes
+    that records whether an entry is missing and how it was
+    formatted (i.e., the number of decimals). The fields of vectors
+    are stored in a second flat array of doubles using a layout from
+    the KeyTable, which also records how the fields are
+    formatted. Values that can't be reproduced exactly from a double
+    are kept as strings in a small side dictionary.
+
+    Values are formatted on access, which means that they are
+    returned as the same strings (or tuples of strings for vectors)
+    as in the stats file and as returned by StatDump.
+
+    Attributes:
+      key_table -- KeyTable shared between dumps.
+      kinds -- Array of type codes indexed by key id.
+      values -- Array of scalar values indexed by key id.
+      vectors -- Array of vector fields indexed by the vector layouts
+                 in the KeyTable.
+      extra -- Dictionary between key ids and non-scalar values.
+    """
+
+    __slots__ = ("key_table", "kinds", "values", "vectors", "extra")
+
+    _MISSING = 0
+    _NAN = 1
+    _RAW = 3
+    _VECTOR = 4
+    _RAW_VECTOR = 5
+    # Numbers are stored as _NUMBER + 1 + the number of decimals,
+    # integers have -1 decimals.
+    _NUMBER = 8
+    _MAX_DECIMALS = 127 - _NUMBER - 1
+
+    def __init__(self, log, key_table):
+        """Load a statistics block from a file.
+
+        Arguments:
+          log -- File-like object to read from.
+          key_table -- KeyTable to store keys in.
+        """
+
+        self.key_table = key_table
+        self.kinds = array.array("b")
+        self.values = array.array("d")
+        self.vectors = array.array("d")
+        self.extra = None
+        self._load(log)
+
+    def _store(self, key, value):
+        key_id = self.key_table.intern(key)
+        kinds = self.kinds
+        if key_id >= len(kinds):
+            pad = key_id + 1 - len(kinds)
+            kinds.extend(_zeros("b", pad))
+            self.values.extend(_zeros("d", pad))
+
+        if not isinstance(value, tuple):
+            if self._store_scalar(key_id, value):
+                return
+        elif self._store_vector(key_id, value):
+            return
+
+        if self.extra is None:
+            self.extra = {}
+        if isinstance(value, tuple):
+            # A single string is a lot smaller than a tuple of strings
+            kinds[key_id] = self._RAW_VECTOR
+            self.extra[key_id] = " ".join(value)
+        else:
+            kinds[key_id] = self._RAW
+            self.extra[key_id] = value
+
+    def _store_scalar(self, key_id, value):
+        if value == "nan":
+            # Formulas dividing by zero are common enough to avoid
+            # storing them as strings.
+            self.kinds[key_id] = self._NAN
+            return True
+
+        decimals, suffix = _field_format(value)
+        if suffix or decimals > self._MAX_DECIMALS:
+            return False
+
+        try:
+            number = float(value)
+            if _format_field(number, (decimals, "")) != value:
+                return False
+        except (ValueError, TypeError, OverflowError):
+            return False
+
+        self.values[key_id] = number
+        self.kinds[key_id] = self._NUMBER + 1 + decimals
+        return True
+
+    def _store_vector(self, key_id, value):
+        parsed = _parse_vector(value)
+        if parsed is None:
+            return False
+
+        fmts, numbers = parsed
+        offset, layout_fmts = self.key_table.layout(key_id, fmts)
+        if fmts != layout_fmts:
+            return False
+
+        vectors = self.vectors
+        size = self.key_table.vector_size
+        if size > len(vectors):
+            vectors.extend(_zeros("d", size - len(vectors)))
+        vectors[offset:offset + len(numbers)] = array.array("d", numbers)
+        self.kinds[key_id] = self._VECTOR
+        return True
+
+    def __getitem__(self, key):
+        key_id = self.key_table.lookup(key)
+        kind = self.kinds[key_id] if key_id < len(self.kinds) \
+            else self._MISSING
+        if kind >= self._NUMBER:
+            return _format_field(self.values[key_id],
+                                 (kind - self._NUMBER - 1, ""))
+        elif kind == self._NAN:
+            return "nan"
+        elif kind == self._RAW:
+            return self.extra[key_id]
+        elif kind == self._VECTOR:
+            offset, fmts = self.key_table.layouts[key_id]
+            vectors = self.vectors
+            return tuple([ _format_field(vectors[offset + i], fmt)
+                           for i, fmt in enumerate(fmts) ])
+        elif kind == self._RAW_VECTOR:
+            return tuple(self.extra[key_id].split())
+        else:
+            raise KeyError(key)
+
+    def keys(self):
+        names = self.key_table.names
+        return [ names[i] for i, kind in enumerate(self.kinds)
+                 if kind != self._MISSING ]
+
+class LazyStatDump(StatDumpBase):
+    """Dump backed by a memory mapped stats file.
+
+    Only the location of the dump in the file is recorded when the
+    dump is created. Entries are located on first access by searching
+    the dump's part of the memory map for the key and then parsing
+    the matching line. Parsed entries are memoized. Queries that
+    only access a few keys per dump therefore never touch most of the
+    file.
+
+    Bulk access through keys() parses the whole dump in one pass
+    instead, after which all lookups are served from the cache.
+
+    Attributes:
+      buf -- Memory map of the stats file.
+      start -- Offset of the first entry in the dump.
+      end -- Offset of the end of the dump.
+      cache -- Dictionary of entries that have been looked up.
+      complete -- True if all entries have been parsed into the cache.
+    """
+
+    __slots__ = ("buf", "start", "end", "cache", "complete")
+
+    def __init__(self, buf, start, end):
+        """Create a dump from a region of a memory map.
+
+        Arguments:
+          buf -- Memory map (or string) of the stats file.
+          start -- Offset of the newline preceding the first entry.
+          end -- Offset of the newline following the last entry.
+        """
+        self.buf = buf
+        self.start = start
+        self.end = end
+        self.cache = None
+        self.complete = False
+
+    def _find(self, key):
+        buf = self.buf
+        pos = buf.find("\n%s " % key, self.start, self.end)
+        if pos == -1:
+            raise KeyError(key)
+
+        eol = buf.find("\n", pos + 1, self.end)
+        line = buf[pos + 1:eol if eol != -1 else self.end]
+        match = self._re_line.match(line)
+        if not match:
+            raise StatFormatError(line, "Invalid statistics entry.")
+
+        values = match.group("values").split()
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def _parse(self):
+        """Parse all entries in the dump into the cache."""
+        # Start over since the cache contains misses that keys()
+        # must not report.
+        self.cache = {}
+        for l in self.buf[self.start:self.end].split("\n"):
+            if _re_empty.match(l):
+                continue
+            if not self._read_line(l):
+                raise StatFormatError(l, "Invalid statistics entry.")
+        self.complete = True
+
+    def _store(self, key, value):
+        self.cache[key] = value
+
+    def __getitem__(self, key):
+        cache = self.cache
+        if cache is None:
+            cache = self.cache = {}
+
+        try:
+            value = cache[key]
+        except KeyError:
+            if self.complete:
+                raise
+            try:
+                value = self._find(key)
+            except KeyError:
+                value = None
+            cache[key] = value
+
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def keys(self):
+        if not self.complete:
+            self._parse()
+        return self.cache.keys()
+
+def _zeros(typecode, count):
+    return array.array(typecode, (0, )) * count
+
+def stream_log(log, compact=False, key_table=None):
     """Generate a stream of StatDumps from a log file.
 
+    A dump that isn't terminated by an end marker is assumed to be
+    still being written and is not part of the stream.
+
     Arguments:
       log -- File-like object representing the stats file.
 
+    Keyword Arguments:
+      compact -- Generate CompactStatDumps instead of StatDumps.
+      key_table -- KeyTable to use for compact dumps. A new table is
+                   created if not specified.
+
     Exceptions:
       StatFormatError -- Raised if the input file is can not be parsed.
     """
 
+    if compact and key_table is None:
+        key_table = KeyTable()
+
     for l in log:
         if _re_empty.match(l):
             continue
         elif _re_dump_begin.match(l):
-            dump = StatDump(log)
+            try:
+                dump = CompactStatDump(log, key_table) if compact \
+                    else StatDump(log)
+            except _IncompleteDump:
+                return
             yield dump
         else:
             raise StatFormatError(
@@ -162,6 +585,88 @@ def stream_log(log):
                 "Unexpected data in file. Expected a simulation "
                 "statistics block.")
 
+def stream_lazy(log):
+    """Generate a stream of LazyStatDumps from a log file.
+
+    Unlike stream_mmap, this works on any file-like object. The lines
+    of a dump are collected into a single string without being
+    parsed. Entries are parsed on first access, which makes it cheap
+    to discard dumps after only looking at a few entries. Like in
+    stream_log, a dump without an end marker is not part of the
+    stream.
+
+    Arguments:
+      log -- File-like object representing the stats file.
+
+    Exceptions:
+      StatFormatError -- Raised if the input file is can not be parsed.
+    """
+
+    for l in log:
+        if _re_empty.match(l):
+            continue
+        elif _re_dump_begin.match(l):
+            # Start with a newline to simplify key lookups.
+            lines = [ "\n" ]
+            for l in log:
+                if _re_dump_end.match(l):
+                    break
+                lines.append(l)
+            else:
+                return
+            buf = "".join(lines)
+            yield LazyStatDump(buf, 0, len(buf))
+        else:
+            raise StatFormatError(
+                l[:-1],
+                "Unexpected data in file. Expected a simulation "
+                "statistics block.")
+
+def stream_mmap(log):
+    """Generate a stream of LazyStatDumps from a log file.
+
+    The file is memory mapped and dump boundaries are located by
+    searching for the begin and end markers, which means that the
+    contents of a dump aren't parsed until they are accessed. Like in
+    stream_log, a dump without an end marker is not part of the
+    stream.
+
+    Arguments:
+      log -- File object representing the stats file. The file must
+             support fileno().
+
+    Exceptions:
+      StatFormatError -- Raised if the input file is can not be parsed.
+    """
+
+    log.seek(0, 2)
+    if log.tell() == 0:
+        return
+    buf = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+
+    pos = 0
+    size = len(buf)
+    while pos < size:
+        begin = buf.find(_dump_begin, pos)
+        gap = buf[pos:begin if begin != -1 else size]
+        if not _re_empty.match(gap):
+            raise StatFormatError(
+                gap.strip().split("\n")[0],
+                "Unexpected data in file. Expected a simulation "
+                "statistics block.")
+        if begin == -1:
+            break
+
+        # Include the newline before the first entry to simplify
+        # key lookups.
+        start = begin + len(_dump_begin) - 1
+        end = buf.find(_dump_end, start)
+        if end == -1:
+            break
+
+        yield LazyStatDump(buf, start, end)
+        pos = end + len(_dump_end)
+
 if __name__ == "__main__":
     for dump in stream_log(open(sys.argv[1], "r")):
         ticks = dump.get_long("sim_ticks")
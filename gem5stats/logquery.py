@@ -32,6 +32,8 @@ from abc import *
 import numbers
 import types
 import inspect
+import bisect
+import collections
 
 def box(val):
     """Automatically wrap common Python types.
@@ -77,6 +79,41 @@ class M5Value(object):
     def __div__(self, other):
         return Div(self, other)
 
+    def __lt__(self, other):
+        return Less(self, other)
+
+    def __le__(self, other):
+        return LessEqual(self, other)
+
+    def __gt__(self, other):
+        return Greater(self, other)
+
+    def __ge__(self, other):
+        return GreaterEqual(self, other)
+
+    def __eq__(self, other):
+        return Equal(self, other)
+
+    def __ne__(self, other):
+        return NotEqual(self, other)
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    # Defining __eq__ would otherwise make expression trees unhashable
+    __hash__ = object.__hash__
+
+    def __nonzero__(self):
+        # Python's and, or, not, and chained comparisons evaluate the
+        # truth value of a tree instead of building a new tree, which
+        # would silently drop part of a predicate.
+        raise TypeError("The truth value of a query is undefined, use & "
+                        "and | instead of and and or and split chained "
+                        "comparisons into (a < b) & (b < c)")
+
     @abstractmethod
     def __call__(self, dump):
         """Evaluate a gem5 query.
@@ -165,6 +202,92 @@ class Div(BinOperator):
     def _fun(self, lhs, rhs):
         return lhs / rhs
 
+class Less(BinOperator):
+    """Test if the left hand side is less than the right hand side"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "<")
+
+    def _fun(self, lhs, rhs):
+        return lhs < rhs
+
+class LessEqual(BinOperator):
+    """Test if the left hand side is less than or equal to the right
+    hand side"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "<=")
+
+    def _fun(self, lhs, rhs):
+        return lhs <= rhs
+
+class Greater(BinOperator):
+    """Test if the left hand side is greater than the right hand side"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, ">")
+
+    def _fun(self, lhs, rhs):
+        return lhs > rhs
+
+class GreaterEqual(BinOperator):
+    """Test if the left hand side is greater than or equal to the
+    right hand side"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, ">=")
+
+    def _fun(self, lhs, rhs):
+        return lhs >= rhs
+
+class Equal(BinOperator):
+    """Test if two elements are equal"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "==")
+
+    def _fun(self, lhs, rhs):
+        return lhs == rhs
+
+class NotEqual(BinOperator):
+    """Test if two elements are different"""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "!=")
+
+    def _fun(self, lhs, rhs):
+        return lhs != rhs
+
+class And(BinOperator):
+    """Logical and of two elements. The right hand side is only
+    evaluated if the left hand side is true. Note that stateful
+    functions on the right hand side will therefore not see every
+    dump."""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "&")
+
+    def __call__(self, x):
+        return bool(self.lhs(x)) and bool(self.rhs(x))
+
+    def _fun(self, lhs, rhs):
+        return bool(lhs) and bool(rhs)
+
+class Or(BinOperator):
+    """Logical or of two elements. The right hand side is only
+    evaluated if the left hand side is false. Note that stateful
+    functions on the right hand side will therefore not see every
+    dump."""
+
+    def __init__(self, lhs, rhs):
+        BinOperator.__init__(self, lhs, rhs, "|")
+
+    def __call__(self, x):
+        return bool(self.lhs(x)) or bool(self.rhs(x))
+
+    def _fun(self, lhs, rhs):
+        return bool(lhs) or bool(rhs)
+
 
 class LogValue(M5Value):
     """Get the value of a named element in a statistics dump. Raises a
@@ -306,6 +429,13 @@ class Accumulate(Function):
         self.start = start
         self.reset()
 
+    def __call__(self, x):
+        # A dump from a sampled stream represents several dumps, see
+        # gem5stats.sampling.
+        weight = getattr(x, "weight", 1)
+        value = self.params[0](x)
+        return self._fun(value * weight if weight != 1 else value)
+
     def _fun(self, x):
         self.accumulator += x
         return self.accumulator
@@ -404,6 +534,13 @@ class Delta(SlidingWindowBase):
     def __init__(self, param):
         SlidingWindowBase.__init__(self, param, 2)
 
+    def __call__(self, x):
+        # The difference between two dumps in a sampled stream is
+        # spread evenly over the dumps the sample represents.
+        weight = getattr(x, "weight", 1)
+        delta = SlidingWindowBase.__call__(self, x)
+        return delta / float(weight) if weight != 1 else delta
+
     def _eval_window(self, window):
         return window[0] - window[1] if len(window) == 2 else window[0]
 
@@ -465,6 +602,195 @@ class SlidingHarmonicMean(SlidingWindowBase):
 
 SlidingHMean=SlidingHarmonicMean
 
+def _exact_quantile(values, q):
+    """Return the q-quantile of a sorted list using linear
+    interpolation between the closest ranks."""
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+class Quantile(Function):
+    """Estimate a quantile of all values of its parameter using the
+    P-square algorithm (Jain and Chlamtac, 1985).
+
+    The estimator uses five markers, so memory usage is constant and
+    every update is O(1). The result is exact until five values have
+    been seen and for q=0 and q=1, where the outer markers hold the
+    exact minimum and maximum.
+
+    Otherwise, the result is an estimate with NO guaranteed error
+    bound, neither on the value nor on the rank of the result. The
+    inner markers are moved by interpolating a parabola through
+    neighboring markers, which assumes a smooth distribution. For
+    multimodal or drifting distributions, the estimate can end up
+    far away from any value that was seen. For example, the median
+    of 5000 zeros followed by 5000 values of 1000 is estimated as
+    roughly 330. Sketches with a guaranteed rank error (e.g., KLL or
+    Greenwald-Khanna) need memory that grows with the required
+    precision and are not provided. Use SlidingQuantile, which is
+    exact, when the error matters.
+
+    NaN values (e.g., from formulas dividing by zero) are ignored
+    since they can't be ordered. The result is NaN until a value that
+    isn't NaN has been seen.
+
+    Arguments:
+      param -- Parameter to evaluate.
+      q -- Quantile to estimate (e.g., 0.5 for the median).
+    """
+    def __init__(self, param, q):
+        Function.__init__(self, param)
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("Quantile must be in the range [0, 1]")
+        self.q = q
+        self.reset()
+
+    def _fun(self, x):
+        if x != x:
+            return self._result()
+
+        heights = self.heights
+        if len(heights) < 5:
+            bisect.insort(heights, x)
+            return self._result()
+
+        pos = self.pos
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(heights, x) - 1
+
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increment[i]
+
+        for i in range(1, 4):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or \
+                    (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                h = self._parabolic(i, d)
+                if not heights[i - 1] < h < heights[i + 1]:
+                    h = heights[i] + d * (heights[i + d] - heights[i]) / \
+                        float(pos[i + d] - pos[i])
+                heights[i] = h
+                pos[i] += d
+
+        return self._result()
+
+    def _result(self):
+        heights = self.heights
+        if not heights:
+            return float("nan")
+        elif len(heights) < 5 or self.pos[4] == 4:
+            # No markers have been moved, the result is still exact
+            return _exact_quantile(heights, self.q)
+
+        # The outer markers track the exact minimum and maximum
+        if self.q == 0.0:
+            return heights[0]
+        elif self.q == 1.0:
+            return heights[4]
+        else:
+            return heights[2]
+
+    def _parabolic(self, i, d):
+        h, n = self.heights, self.pos
+        return h[i] + float(d) / (n[i + 1] - n[i - 1]) * \
+            ((n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / float(n[i + 1] - n[i]) +
+             (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / float(n[i] - n[i - 1]))
+
+    def _reset(self):
+        q = self.q
+        self.heights = []
+        self.pos = [ 0, 1, 2, 3, 4 ]
+        self.desired = [ 0.0, 2 * q, 4 * q, 2 + 2 * q, 4.0 ]
+        self.increment = [ 0.0, q / 2, q, (1 + q) / 2, 1.0 ]
+
+    def __str__(self):
+        return "%s(%s, q=%s)" % (self.name, self.params[0], self.q)
+
+class RunningHistogram(Function):
+    """Count the values of its parameter in a set of bins.
+
+    The histogram is returned as a tuple with one count per bin. Bin i
+    counts values in the range [bins[i - 1], bins[i]), the first bin
+    counts values below bins[0], and the last bin counts values that
+    are larger than or equal to bins[-1]. Memory usage is constant and
+    every update is O(log(len(bins))). Counts are exact. NaN values
+    aren't counted.
+
+    Arguments:
+      param -- Parameter to evaluate.
+      bins -- Sorted list of bin edges.
+    """
+    def __init__(self, param, bins):
+        Function.__init__(self, param)
+        self.bins = list(bins)
+        if self.bins != sorted(self.bins):
+            raise ValueError("Bin edges must be sorted")
+        self.reset()
+
+    def _fun(self, x):
+        if x == x:
+            self.counts[bisect.bisect_right(self.bins, x)] += 1
+        return tuple(self.counts)
+
+    def _reset(self):
+        self.counts = [ 0 ] * (len(self.bins) + 1)
+
+    def __str__(self):
+        return "%s(%s, bins=%s)" % (self.name, self.params[0], self.bins)
+
+class SlidingQuantile(Function):
+    """Calculate the exact quantile of a sliding window.
+
+    The window is kept both in arrival order and in sorted order,
+    which makes every update O(log(length)) comparisons plus a memory
+    move of at most length elements.
+
+    NaN values are ignored and don't enter the window. The result is
+    NaN while the window is empty.
+
+    Arguments:
+      param  -- Parameter to evaluate.
+      q -- Quantile to calculate (e.g., 0.5 for the median).
+      length -- Size of the window.
+    """
+    def __init__(self, param, q, length):
+        Function.__init__(self, param)
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("Quantile must be in the range [0, 1]")
+        self.q = q
+        self.length = length
+        self.reset()
+
+    def _fun(self, x):
+        if x == x:
+            if len(self.window) == self.length:
+                old = self.window.popleft()
+                del self.sorted[bisect.bisect_left(self.sorted, old)]
+
+            self.window.append(x)
+            bisect.insort(self.sorted, x)
+
+        return _exact_quantile(self.sorted, self.q) if self.sorted \
+            else float("nan")
+
+    def _reset(self):
+        self.window = collections.deque()
+        self.sorted = []
+
+    def __str__(self):
+        return "%s(%s, q=%s, length=%i)" % (self.name, self.params[0],
+                                            self.q, self.length)
+
 def eval_fun(expr, extra=None):
     """Evaluate a gem5 stats query and return an expression tree.
 
@@ -498,3 +824,83 @@ if __name__ == "__main__":
     print expr_d
     print IPC("system.cpu_kvm")
     print eval_fun("LV('host_seconds') + 1.0")
+
+    # Check the streaming quantile functions against exact
+    # results. The input is generated from a fixed seed, so the
+    # checks are deterministic.
+    import random
+    rng = random.Random(1)
+    samples = [ rng.expovariate(1.0) for i in range(10000) ]
+    exact = sorted(samples)
+
+    # Quantile has no guaranteed error bound, but the rank of the
+    # estimate is within 1% of q on a smooth distribution.
+    for q in (0.1, 0.5, 0.9, 0.99):
+        estimate = Quantile(Constant(0), q)
+        for x in samples:
+            result = estimate._fun(x)
+        rank = bisect.bisect_left(exact, result) / float(len(exact))
+        print "%s: %f (exact: %f, rank: %f)" % (
+            estimate, result, _exact_quantile(exact, q), rank)
+        assert abs(rank - q) <= 0.01
+
+    # Results are exact for the first five values and at the extremes
+    for q in (0.0, 0.25, 0.5, 1.0):
+        estimate = Quantile(Constant(0), q)
+        for n, x in enumerate(samples[:5]):
+            result = estimate._fun(x)
+            assert result == _exact_quantile(sorted(samples[:n + 1]), q)
+    for q, expected in ((0.0, exact[0]), (1.0, exact[-1])):
+        estimate = Quantile(Constant(0), q)
+        for x in samples:
+            result = estimate._fun(x)
+        assert result == expected
+
+    histogram = RunningHistogram(Constant(0), [ 1.0, 2.0, 3.0 ])
+    for x in (0.5, 1.0, 1.5, 2.5, 3.0, 7.0, -1.0):
+        result = histogram._fun(x)
+    print "%s: %s" % (histogram, result)
+    assert result == (2, 2, 1, 2)
+
+    histogram = RunningHistogram(Constant(0), [ 0.5, 1.0, 2.0 ])
+    for x in samples:
+        result = histogram._fun(x)
+    assert result == (bisect.bisect_left(exact, 0.5),
+                      bisect.bisect_left(exact, 1.0) - \
+                          bisect.bisect_left(exact, 0.5),
+                      bisect.bisect_left(exact, 2.0) - \
+                          bisect.bisect_left(exact, 1.0),
+                      len(exact) - bisect.bisect_left(exact, 2.0))
+
+    # SlidingQuantile is exact for every window, including partially
+    # filled windows at the start.
+    for q in (0.0, 0.5, 0.9, 1.0):
+        window = SlidingQuantile(Constant(0), q, 100)
+        for n, x in enumerate(samples[:1000]):
+            result = window._fun(x)
+            assert result == _exact_quantile(
+                sorted(samples[max(n - 99, 0):n + 1]), q)
+        print "%s: %f" % (window, result)
+
+    # NaN values are ignored, so a stream with NaNs gives the same
+    # results as the stream without them.
+    import copy
+    nan = float("nan")
+    with_nan = [ nan ]
+    for n, x in enumerate(samples[:1000]):
+        with_nan.append(x)
+        if n % 7 == 0:
+            with_nan.append(nan)
+
+    for fun in (Quantile(Constant(0), 0.5),
+                SlidingQuantile(Constant(0), 0.5, 5),
+                RunningHistogram(Constant(0), [ 0.5, 1.0, 2.0 ])):
+        reference = copy.deepcopy(fun)
+        expected = reference._fun(nan)
+        for x in with_nan:
+            result = fun._fun(x)
+            if x == x:
+                expected = reference._fun(x)
+            assert result == expected or \
+                (result != result and expected != expected)
+        print "%s with NaN: %s" % (fun, result)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats.log import StatDumpBase
+
+import array
+import copy
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+class _RecordingDump(StatDumpBase):
+    """Dump wrapper that records the keys that are looked up."""
+
+    def __init__(self, dump):
+        self.dump = dump
+        self.used = set()
+
+    def __getitem__(self, key):
+        self.used.add(key)
+        return self.dump[key]
+
+    def keys(self):
+        return self.dump.keys()
+
+def used_keys(funs, dump):
+    """Return the set of keys used when evaluating a list of
+    expression trees on a dump.
+
+    The trees are copied before they are evaluated, so their internal
+    state isn't affected. Keys that are only used conditionally
+    (e.g., on the right hand side of &) may be missed if the
+    condition isn't met for this dump.
+    """
+    recorder = _RecordingDump(dump)
+    for f in copy.deepcopy(funs):
+        try:
+            f(recorder)
+        except (KeyError, ValueError, TypeError, ZeroDivisionError):
+            pass
+    return recorder.used
+
+class Columns(object):
+    """Stat columns stored in shared memory.
+
+    Every key is stored as a column of doubles in one large shared
+    array together with an array of flags recording whether the key
+    was present in a dump. The arrays are allocated from shared
+    memory and are inherited by worker processes without being
+    copied. Values that aren't numbers (e.g., vectors) are kept
+    unmodified in a dictionary, which makes lookups behave exactly
+    like lookups in the original dumps.
+
+    Attributes:
+      index -- Dictionary between keys and column numbers.
+      dumps -- Number of dumps (rows) in every column.
+      values -- Shared array of values, one column per key.
+      present -- Shared array of presence flags, one column per key.
+      other -- Dictionary between positions in the arrays and values
+               that aren't numbers.
+    """
+
+    _MISSING = 0
+    _NUMBER = 1
+    _OTHER = 2
+
+    def __init__(self, keys, stream):
+        """Load columns from a stream of dumps.
+
+        Arguments:
+          keys -- List of keys to load.
+          stream -- Stream of dumps.
+        """
+        keys = sorted(keys)
+        self.index = dict([ (k, i) for i, k in enumerate(keys) ])
+
+        values = [ array.array("d") for k in keys ]
+        present = [ array.array("b") for k in keys ]
+        other = [ {} for k in keys ]
+        self.dumps = 0
+        for dump in stream:
+            for k, v, p, o in zip(keys, values, present, other):
+                try:
+                    value = dump[k]
+                except KeyError:
+                    v.append(0.0)
+                    p.append(self._MISSING)
+                    continue
+
+                try:
+                    v.append(float(value))
+                    p.append(self._NUMBER)
+                except (ValueError, TypeError):
+                    v.append(0.0)
+                    p.append(self._OTHER)
+                    o[self.dumps] = value
+            self.dumps += 1
+
+        self.other = {}
+        for i, o in enumerate(other):
+            for no, value in o.items():
+                self.other[i * self.dumps + no] = value
+
+        self.values = RawArray(ctypes.c_double, len(keys) * self.dumps)
+        self.present = RawArray(ctypes.c_byte, len(keys) * self.dumps)
+        for i, (v, p) in enumerate(zip(values, present)):
+            self._copy(self.values, v, i, ctypes.sizeof(ctypes.c_double))
+            self._copy(self.present, p, i, ctypes.sizeof(ctypes.c_byte))
+
+    def _copy(self, dst, src, column, size):
+        if not src:
+            return
+        addr, count = src.buffer_info()
+        ctypes.memmove(ctypes.addressof(dst) + column * self.dumps * size,
+                       addr, count * size)
+
+class _MissingColumn(Exception):
+    """A tree looked up a key that wasn't loaded into the columns.
+
+    This intentionally isn't a KeyError since trees treat KeyErrors
+    as missing stats (e.g., to return a default value).
+    """
+
+    def __init__(self, key):
+        Exception.__init__(self, key)
+        self.key = key
+
+class ColumnDump(StatDumpBase):
+    """One row of a set of shared stat columns.
+
+    Numbers are returned as floats, other values as they were
+    returned by the original dump. Looking up a key that wasn't
+    loaded raises a _MissingColumn exception.
+    """
+
+    __slots__ = ("columns", "no")
+
+    def __init__(self, columns, no):
+        self.columns = columns
+        self.no = no
+
+    def __getitem__(self, key):
+        columns = self.columns
+        try:
+            pos = columns.index[key] * columns.dumps + self.no
+        except KeyError:
+            raise _MissingColumn(key)
+        present = columns.present[pos]
+        if present == Columns._NUMBER:
+            return columns.values[pos]
+        elif present == Columns._OTHER:
+            return columns.other[pos]
+        else:
+            raise KeyError(key)
+
+    def keys(self):
+        columns = self.columns
+        return [ k for k, i in columns.index.items()
+                 if columns.present[i * columns.dumps + self.no] ]
+
+# State shared with worker processes. Set before the worker pool is
+# created so that it's inherited by the workers when they are forked.
+_shared = None
+
+def _evaluate_chunk(chunk):
+    """Evaluate a list of trees over all dumps. Returns a list with
+    one (True, results) tuple per tree, or (False, key) if the tree
+    used a key that wasn't loaded."""
+    columns, funs = _shared
+    dumps = [ ColumnDump(columns, no) for no in xrange(columns.dumps) ]
+    results = []
+    for i in chunk:
+        # Evaluate a copy to keep the tree intact if it has to be
+        # evaluated again with more columns.
+        f = copy.deepcopy(funs[i])
+        try:
+            results.append((True, [ f(d) for d in dumps ]))
+        except _MissingColumn as e:
+            results.append((False, e.key))
+    return results
+
+def _unpack(stream):
+    for dump in stream:
+        yield dump[0] if isinstance(dump, tuple) else dump
+
+def evaluate(stream, funs, jobs=None, chunks_per_job=4, reopen=None):
+    """Evaluate a large number of expression trees in parallel.
+
+    The stats used by the trees are loaded into shared memory in one
+    pass over the stream. The trees are then split into chunks that
+    are evaluated by a pool of worker processes, each tree over all
+    dumps. The worker processes access the stats without copying
+    them.
+
+    The keys used by the trees are determined by evaluating copies of
+    the trees on the first dump. Trees may use keys that weren't used
+    for the first dump (e.g., on the right hand side of &). When this
+    happens, the missing keys are added, the columns are loaded again
+    from a new stream returned by reopen, and the affected trees are
+    evaluated again. This repeats until all trees have been
+    evaluated.
+
+    Returns a list of rows, one per dump, containing the result of
+    every tree.
+
+    Arguments:
+      stream -- Stream of dumps.
+      funs -- List of expression trees.
+
+    Keyword Arguments:
+      jobs -- Number of worker processes, defaults to the number of CPUs.
+      chunks_per_job -- Number of chunks of trees per worker process.
+      reopen -- Function returning a new stream of the same dumps.
+                A KeyError is raised for trees using keys that weren't
+                used for the first dump if not specified.
+    """
+    global _shared
+
+    stream = iter(stream)
+    try:
+        first = stream.next()
+    except StopIteration:
+        return []
+
+    def dumps():
+        yield first
+        for dump in stream:
+            yield dump
+
+    first_dump = first[0] if isinstance(first, tuple) else first
+    keys = used_keys(funs, first_dump)
+    columns = Columns(keys, _unpack(dumps()))
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    out = [ None ] * len(funs)
+    pending = range(len(funs))
+    while True:
+        count = max(min(jobs * chunks_per_job, len(pending)), 1)
+        chunks = [ pending[i::count] for i in range(count) ]
+
+        _shared = (columns, funs)
+        try:
+            if jobs <= 1:
+                results = map(_evaluate_chunk, chunks)
+            else:
+                pool = multiprocessing.Pool(jobs)
+                try:
+                    results = pool.map(_evaluate_chunk, chunks)
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            _shared = None
+
+        missing = set()
+        pending = []
+        for chunk, result in zip(chunks, results):
+            for i, (done, value) in zip(chunk, result):
+                if done:
+                    out[i] = value
+                else:
+                    pending.append(i)
+                    missing.add(value)
+
+        if not pending:
+            break
+        elif reopen is None:
+            raise KeyError(missing.pop())
+
+        keys = keys | missing
+        columns = Columns(keys, _unpack(reopen()))
+
+    return zip(*out) if out else []
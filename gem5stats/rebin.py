@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats.log import StatDumpBase
+from gem5stats.util import KeyMatcher
+
+# Stats that are cumulative by default. Like all other stats that
+# aren't integers (e.g., ratios and formulas), these are taken from
+# the last dump in an interval.
+default_last = (
+    "final_tick",
+    "sim_freq",
+    "host_mem_usage",
+)
+
+# Stats that aren't integers but are reset between dumps and therefore
+# summed.
+default_sum = (
+    "sim_seconds",
+    "host_seconds",
+)
+
+def _number(value):
+    if isinstance(value, (int, long, float)):
+        return value
+
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def _integer(value):
+    """Return a value as an integer or None if it isn't one."""
+    if isinstance(value, (int, long)):
+        return value
+    elif isinstance(value, float):
+        return None
+
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def _ticks(dump, key):
+    # Tick counts may exceed the precision of a float
+    try:
+        return dump.get_long(key)
+    except ValueError:
+        return long(dump.get_float(key))
+
+class MergedStatDump(StatDumpBase):
+    """Dump created by merging several consecutive dumps.
+
+    Integer stats are assumed to be counters that are reset between
+    dumps and are summed over all merged dumps. Stats that aren't
+    integers (e.g., ratios such as ipc and other formulas), vectors,
+    and cumulative stats are taken from the last dump. Stats that
+    should be summed even though they aren't integers (e.g.,
+    sim_seconds) can be selected explicitly. Summed scalars are
+    returned as numbers.
+
+    Dumps are merged one at a time, so only the merged result is
+    kept in memory.
+
+    Attributes:
+      data -- Dictionary between stat keys and values.
+      count -- Number of dumps that were merged.
+    """
+
+    def __init__(self, is_last, is_sum):
+        """Create an empty merged dump.
+
+        Arguments:
+          is_last -- Function returning True for keys that should be
+                     taken from the last dump instead of being summed.
+          is_sum -- Function returning True for keys that should be
+                    summed even if they aren't integers.
+        """
+        self.is_last = is_last
+        self.is_sum = is_sum
+        self.count = 0
+        self.data = {}
+
+    def add(self, dump):
+        """Merge a dump into this dump.
+
+        Arguments:
+          dump -- Dump following the dumps that have been merged.
+        """
+        self.count += 1
+        for key in dump.keys():
+            self._store(key, dump[key])
+
+    def _store(self, key, value):
+        data = self.data
+        if key in data and not isinstance(value, tuple) and \
+                not self.is_last(key):
+            if self.is_sum(key):
+                try:
+                    data[key] = _number(data[key]) + _number(value)
+                    return
+                except (ValueError, TypeError):
+                    pass
+            else:
+                old, new = _integer(data[key]), _integer(value)
+                if old is not None and new is not None:
+                    data[key] = old + new
+                    return
+
+        data[key] = value
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def keys(self):
+        return self.data.keys()
+
+def rebin(stream, interval, tick_key="final_tick", last=default_last,
+          sum=default_sum):
+    """Group consecutive dumps into fixed intervals of simulated time.
+
+    Dumps are assigned to intervals based on a cumulative tick stat,
+    which holds the tick at the end of the period covered by a
+    dump. Intervals are closed at their end, which means that a dump
+    taken exactly on an interval boundary closes the interval that it
+    ends instead of opening the next one. One MergedStatDump is
+    generated per non-empty interval. Intervals that only contain one
+    dump emit that dump unmodified. See MergedStatDump for how stats
+    are merged.
+
+    Arguments:
+      stream -- Stream of dumps.
+      interval -- Length of an interval in ticks.
+
+    Keyword Arguments:
+      tick_key -- Cumulative stat used to assign dumps to intervals.
+      last -- List of keys or wildcards for stats that are
+              cumulative. These are taken from the last dump in an
+              interval instead of being summed.
+      sum -- List of keys or wildcards for stats that are summed
+             even if they aren't integers.
+    """
+
+    is_last = KeyMatcher(tuple(last) + (tick_key, ))
+    is_sum = KeyMatcher(sum)
+
+    # The first dump of an interval is kept until it's known whether
+    # there are more dumps to merge it with.
+    first = None
+    merged = None
+    cur_bin = None
+    for dump in stream:
+        dump_bin = (_ticks(dump, tick_key) - 1) // interval
+        if first is not None and dump_bin != cur_bin:
+            yield merged if merged is not None else first
+            first = merged = None
+
+        cur_bin = dump_bin
+        if first is None:
+            first = dump
+        else:
+            if merged is None:
+                merged = MergedStatDump(is_last, is_sum)
+                merged.add(first)
+            merged.add(dump)
+
+    if first is not None:
+        yield merged if merged is not None else first
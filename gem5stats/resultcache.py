@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+import hashlib
+import marshal
+import os
+import zlib
+
+_version = 2
+
+def default_dir():
+    """Return the default cache directory. Can be overridden using
+    the GEM5STATS_CACHE environment variable."""
+    return os.environ.get(
+        "GEM5STATS_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cache", "gem5stats"))
+
+def cache_key(fingerprint, exprs, **params):
+    """Return the cache key of a query.
+
+    Arguments:
+      fingerprint -- Fingerprint of the log (see util.fingerprint).
+      exprs -- List of query strings. Expression trees can't be
+               used since their string representation doesn't
+               include all of their parameters (e.g., defaults).
+
+    Any keyword arguments are treated as parameters (e.g., slicing)
+    that affect the results of the query.
+    """
+    key = repr((_version, fingerprint, list(exprs),
+                sorted(params.items())))
+    return hashlib.sha1(key).hexdigest()
+
+class ResultCache(object):
+    """Disk cache of query results.
+
+    Every entry is stored as a compressed file in the cache
+    directory. The modification time of an entry is updated whenever
+    it's used, which makes it possible to evict the least recently
+    used entries when the total size of the cache exceeds its limit.
+    """
+
+    suffix = ".result"
+
+    def __init__(self, directory=None, max_size=256 << 20):
+        """Open a cache.
+
+        Keyword Arguments:
+          directory -- Cache directory, see default_dir().
+          max_size -- Maximum size of the cache in bytes.
+        """
+        self.directory = directory if directory else default_dir()
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Return the list of result rows stored for a key or None if
+        the key isn't in the cache."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                rows = marshal.loads(zlib.decompress(f.read()))
+            os.utime(path, None)
+            return rows
+        except (IOError, OSError, EOFError, ValueError, TypeError,
+                zlib.error):
+            return None
+
+    def put(self, key, rows):
+        """Store a list of result rows.
+
+        Arguments:
+          key -- Cache key from cache_key().
+          rows -- List of tuples containing the results of every dump.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        path = self._path(key)
+        tmp = "%s.%i.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(marshal.dumps([ tuple(r) for r in rows ],
+                                                2)))
+        os.rename(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is
+        smaller than its size limit."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats.log import StatDumpBase
+
+import math
+import random
+
+class SampledStatDump(StatDumpBase):
+    """Dump selected by a sampler.
+
+    Every sampled dump represents itself and the dumps that were
+    skipped since the previous sample. Accumulate and Delta use the
+    weight to scale their results, which means that
+    Accumulate(Delta(x)) of a cumulative stat is exact and Accumulate
+    of a stat that is reset between dumps is an unbiased estimate of
+    the total.
+
+    Attributes:
+      dump -- Underlying dump.
+      weight -- Number of dumps represented by this dump.
+    """
+
+    __slots__ = ("dump", "weight")
+
+    def __init__(self, dump, weight):
+        self.dump = dump
+        self.weight = weight
+
+    def __getitem__(self, key):
+        return self.dump[key]
+
+    def keys(self):
+        return self.dump.keys()
+
+class Sampler(object):
+    """Base class for samplers.
+
+    A sampler is an iterator that wraps a stream of dumps and only
+    generates a subset of the dumps. Dumps that aren't sampled are
+    never accessed, which makes skipping them cheap when the
+    underlying stream creates dumps lazily (e.g., log.stream_mmap).
+
+    The last dump of the stream is always sampled so that the dumps
+    after the last regular sample are represented as well.
+
+    Attributes:
+      total -- Number of dumps seen so far.
+      samples -- Number of dumps sampled so far.
+    """
+
+    def __init__(self, stream):
+        self.stream = iter(stream)
+        self.total = 0
+        self.samples = 0
+        self.last = 0
+        self.skipped = None
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        while True:
+            try:
+                dump = self.stream.next()
+            except StopIteration:
+                if self.total == self.last:
+                    raise
+                return self._emit(self.skipped)
+
+            self.total += 1
+            if self._sample(self.total - 1):
+                return self._emit(dump)
+            self.skipped = dump
+
+    def _emit(self, dump):
+        self.samples += 1
+        weight = self.total - self.last
+        self.last = self.total
+        self.skipped = None
+        return SampledStatDump(dump, weight)
+
+    def _sample(self, no):
+        """Return True if dump number no should be sampled."""
+        raise NotImplementedError()
+
+class SystematicSampler(Sampler):
+    """Sample the last dump in every group of step dumps."""
+
+    def __init__(self, stream, step):
+        Sampler.__init__(self, stream)
+        self.step = step
+
+    def _sample(self, no):
+        return no % self.step == self.step - 1
+
+class RandomSampler(Sampler):
+    """Sample every dump with a fixed probability."""
+
+    def __init__(self, stream, fraction, seed=None):
+        Sampler.__init__(self, stream)
+        self.fraction = fraction
+        self.random = random.Random(seed)
+
+    def _sample(self, no):
+        return self.random.random() < self.fraction
+
+def sample_ci(stats, total, confidence=0.95):
+    """Return the half width of the confidence interval of the mean
+    of an expression over all dumps, based on its values in the
+    sampled dumps.
+
+    The finite population correction is applied since the total
+    number of dumps is known.
+
+    Arguments:
+      stats -- RunningStats of the values from the sampled dumps.
+      total -- Total number of dumps.
+
+    Keyword Arguments:
+      confidence -- Confidence level (0.90, 0.95, or 0.99).
+    """
+    n = stats.count
+    if n < 2:
+        return float("nan")
+    fpc = math.sqrt(max(total - n, 0) / float(total - 1))
+    return stats.ci(confidence) * fpc
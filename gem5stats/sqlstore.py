@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats.log import StatDumpBase
+
+import sqlite3
+
+_schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    dumps INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS keys (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stats (
+    run INTEGER NOT NULL,
+    key INTEGER NOT NULL,
+    dump INTEGER NOT NULL,
+    value,
+    vector INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Indexes are created after bulk inserts since maintaining them
+# during the insert is a lot slower.
+_indexes = """
+CREATE INDEX IF NOT EXISTS stats_run_key_dump ON stats (run, key, dump);
+CREATE INDEX IF NOT EXISTS stats_run_dump ON stats (run, dump);
+"""
+
+# SQLite limits the number of parameters in a statement
+_max_params = 900
+
+# Range of SQLite's integer type
+_int_min = -(1 << 63)
+_int_max = (1 << 63) - 1
+
+def connect(name):
+    """Open (and create if needed) a stats database.
+
+    Arguments:
+      name -- File name of the database.
+    """
+    db = sqlite3.connect(name)
+    db.text_factory = str
+    db.executescript(_schema)
+    return db
+
+def _encode(value):
+    """Convert a stat value to a (value, vector) tuple suitable for
+    storing in the database."""
+    if isinstance(value, tuple):
+        return " ".join(value), 1
+
+    try:
+        i = int(value)
+        # SQLite integers are 64-bit signed, larger values (e.g.,
+        # unsigned stats set to all ones) are stored as text.
+        return (i, 0) if _int_min <= i <= _int_max else (str(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        f = float(value)
+        # SQLite stores NaN as NULL, keep the original string instead
+        return (f, 0) if f == f else (value, 0)
+    except ValueError:
+        return value, 0
+
+def _decode(value, vector):
+    return tuple(value.split()) if vector else value
+
+class Exporter(object):
+    """Bulk insert stat dumps into a database.
+
+    Keys are interned in the keys table and dumps are inserted in
+    batches, each batch in its own transaction.
+    """
+
+    def __init__(self, db, batch_size=16):
+        """Create a new exporter.
+
+        Arguments:
+          db -- Database connection from connect().
+
+        Keyword Arguments:
+          batch_size -- Number of dumps per transaction.
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.key_ids = dict(db.execute("SELECT name, id FROM keys"))
+
+    def _key_id(self, key):
+        try:
+            return self.key_ids[key]
+        except KeyError:
+            key_id = self.db.execute("INSERT INTO keys (name) VALUES (?)",
+                                     (key, )).lastrowid
+            self.key_ids[key] = key_id
+            return key_id
+
+    def export(self, run, stream):
+        """Store a stream of dumps as a run. Any previous data for the
+        run is replaced.
+
+        Arguments:
+          run -- Name of the run.
+          stream -- Stream of StatDumps.
+
+        Returns the number of dumps inserted.
+        """
+        db = self.db
+        with db:
+            db.execute("INSERT OR IGNORE INTO runs (name) VALUES (?)", (run, ))
+            run_id, = db.execute("SELECT id FROM runs WHERE name = ?",
+                                 (run, )).fetchone()
+            db.execute("DELETE FROM stats WHERE run = ?", (run_id, ))
+            db.execute("UPDATE runs SET dumps = 0 WHERE id = ?", (run_id, ))
+
+        no = 0
+        rows = []
+        for no, dump in enumerate(stream, 1):
+            for key in dump.keys():
+                value, vector = _encode(dump[key])
+                rows.append((run_id, self._key_id(key), no - 1, value, vector))
+
+            if no % self.batch_size == 0:
+                self._flush(run_id, no, rows)
+                rows = []
+
+        self._flush(run_id, no, rows)
+
+        db.executescript(_indexes)
+        return no
+
+    def _flush(self, run_id, dumps, rows):
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO stats (run, key, dump, value, vector) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.execute("UPDATE runs SET dumps = ? WHERE id = ?",
+                            (dumps, run_id))
+
+def list_runs(db):
+    """Return a list of (name, dumps) tuples for all runs in a
+    database."""
+    return db.execute("SELECT name, dumps FROM runs ORDER BY name").fetchall()
+
+class SQLStatDump(StatDumpBase):
+    """Dump backed by a stats database.
+
+    Entries are loaded from the database on demand and memoized.
+    Scalars are returned as numbers.
+
+    Attributes:
+      stream -- SQLStream the dump belongs to.
+      dump -- Dump number within the run.
+      data -- Dictionary of entries that have been loaded.
+    """
+
+    __slots__ = ("stream", "dump", "data")
+
+    def __init__(self, stream, dump, data):
+        self.stream = stream
+        self.dump = dump
+        self.data = data
+
+    def __getitem__(self, key):
+        try:
+            value = self.data[key]
+        except KeyError:
+            value = self.stream._fetch(self.dump, key)
+            self.data[key] = value
+
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def keys(self):
+        return self.stream._keys(self.dump)
+
+class SQLStream(object):
+    """Stream of dumps from a run in a stats database.
+
+    Keys requested from a dump are remembered and fetched for all
+    subsequent dumps using a single query. Since queries normally
+    access the same keys in every dump, this means that most dumps
+    are loaded using one query.
+    """
+
+    def __init__(self, db, run):
+        """Open a run.
+
+        Arguments:
+          db -- Database connection from connect().
+          run -- Name of the run.
+        """
+        row = db.execute("SELECT id, dumps FROM runs WHERE name = ?",
+                         (run, )).fetchone()
+        if row is None:
+            raise KeyError(run)
+
+        self.db = db
+        self.run_id, self.dumps = row
+        self.key_ids = {}
+        self.hot = []
+
+    def __iter__(self):
+        for no in xrange(self.dumps):
+            yield SQLStatDump(self, no, self._prefetch(no))
+
+    def _key_id(self, key):
+        try:
+            return self.key_ids[key]
+        except KeyError:
+            row = self.db.execute("SELECT id FROM keys WHERE name = ?",
+                                  (key, )).fetchone()
+            key_id = row[0] if row else None
+            self.key_ids[key] = key_id
+            return key_id
+
+    def _prefetch(self, dump):
+        data = dict([ (k, None) for k in self.hot ])
+        ids = dict([ (self.key_ids[k], k) for k in self.hot
+                     if self.key_ids[k] is not None ])
+        id_list = ids.keys()
+        for i in range(0, len(id_list), _max_params):
+            chunk = id_list[i:i + _max_params]
+            for key_id, value, vector in self.db.execute(
+                "SELECT key, value, vector FROM stats "
+                "WHERE run = ? AND dump = ? AND key IN (%s)" % \
+                    ",".join("?" * len(chunk)),
+                [ self.run_id, dump ] + chunk):
+                data[ids[key_id]] = _decode(value, vector)
+        return data
+
+    def _fetch(self, dump, key):
+        self.hot.append(key)
+        key_id = self._key_id(key)
+        if key_id is None:
+            return None
+
+        row = self.db.execute(
+            "SELECT value, vector FROM stats "
+            "WHERE run = ? AND key = ? AND dump = ?",
+            (self.run_id, key_id, dump)).fetchone()
+        return _decode(*row) if row else None
+
+    def _keys(self, dump):
+        return [ k for k, in self.db.execute(
+                "SELECT keys.name FROM stats JOIN keys ON stats.key = keys.id "
+                "WHERE stats.run = ? AND stats.dump = ?",
+                (self.run_id, dump)) ]
+
+def stream_db(db, run):
+    """Generate a stream of dumps from a run in a stats database.
+
+    Arguments:
+      db -- Database connection from connect().
+      run -- Name of the run.
+    """
+    return iter(SQLStream(db, run))
@@ -28,6 +28,10 @@
 #
 # Authors: Andreas Sandberg
 
+import fnmatch
+import hashlib
+import os
+
 class BufferedISlice(object):
     """Iterator with semantics similar to normal array slicing
     ([start:stop:step]).
@@ -68,14 +72,14 @@ class BufferedISlice(object):
             raise StopIteration()
 
         while self.cur < self.start:
-            self.cur += 1
             self.stream.next()
+            self.cur += 1
 
         try:
             while len(self.buffer) < self.buffer_size and \
                     (self.stop is None or self.stop < 0 or self.stop > self.cur):
-                self.cur += 1
                 self.buffer.append(self.stream.next())
+                self.cur += 1
         except StopIteration:
             pass
 
@@ -96,3 +100,85 @@ class BufferedISlice(object):
             out = tuple(self.buffer[0:self.step])
             self.buffer = self.buffer[self.step:]
             return out[0] if self.step == 1 else out
+
+class CountingReader(object):
+    """Line iterator that keeps track of the number of bytes
+    consumed from a file.
+
+    File iteration reads ahead, which makes tell() unreliable while
+    iterating over a file. This wrapper counts the length of every
+    line returned instead, which makes it possible to determine the
+    file offset of a line without disabling read-ahead.
+
+    Attributes:
+      offset -- File offset after the last line returned.
+    """
+
+    def __init__(self, stream, offset=0):
+        """Wrap a file.
+
+        Arguments:
+          stream -- File-like object to read lines from.
+
+        Keyword Arguments:
+          offset -- Current position in the file.
+        """
+        self.stream = iter(stream)
+        self.offset = offset
+        self.name = getattr(stream, "name", None)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self.stream.next()
+        self.offset += len(line)
+        return line
+
+class KeyMatcher(object):
+    """Match stat keys against a list of names or shell-style
+    wildcards.
+
+    Results are cached per key since the same keys show up in every
+    dump of a log.
+    """
+
+    def __init__(self, patterns):
+        """Create a new matcher.
+
+        Arguments:
+          patterns -- List of keys or wildcards (e.g., 'system.cpu*.ipc').
+        """
+        self.patterns = tuple(patterns)
+        self.cache = {}
+
+    def __call__(self, key):
+        try:
+            return self.cache[key]
+        except KeyError:
+            match = any(fnmatch.fnmatchcase(key, p) for p in self.patterns)
+            self.cache[key] = match
+            return match
+
+    def keys(self, dump):
+        """Return a sorted list of the keys in a dump that match."""
+        return sorted(k for k in dump.keys() if self(k))
+
+def fingerprint(name, content_hash=False):
+    """Return a value identifying the current version of a file.
+
+    Arguments:
+      name -- Name of the file.
+
+    Keyword Arguments:
+      content_hash -- Include a SHA-1 hash of the file contents.
+    """
+    st = os.stat(name)
+    fp = (os.path.abspath(name), st.st_size, int(st.st_mtime))
+    if content_hash:
+        h = hashlib.sha1()
+        with open(name, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), ""):
+                h.update(chunk)
+        fp += (h.hexdigest(), )
+    return fp
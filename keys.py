@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import keyindex
+import sys
+import os
+import argparse
+
+def format_ranges(ranges):
+    return ",".join([ "%i-%i" % r if r[0] != r[1] else "%i" % r[0]
+                      for r in ranges ])
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List the stat keys in a gem5 log.')
+    parser.add_argument('log', metavar='LOG', type=str,
+                        help='Log file')
+    parser.add_argument('pattern', metavar='PATTERN', type=str, nargs='?',
+                        default=None,
+                        help='Shell-style wildcard to match keys against')
+
+    parser.add_argument("--prefix", metavar="PREFIX", type=str, default=None,
+                        help="List keys starting with PREFIX")
+
+    parser.add_argument("--regex", metavar="RE", type=str, default=None,
+                        help="List keys matching a regular expression")
+
+    parser.add_argument("--children", metavar="PATH", type=str, default=None,
+                        help="List the children of a SimObject "
+                        "(e.g., system.cpu3.dcache.)")
+
+    parser.add_argument("--ranges", action="store_true", default=False,
+                        help="Print the dumps where each key is present")
+
+    parser.add_argument("--first-only", action="store_true", default=False,
+                        help="Only scan the first dump when building "
+                        "the index")
+
+    parser.add_argument("--no-cache", action="store_true", default=False,
+                        help="Don't load or store a cached index")
+
+    args = parser.parse_args()
+
+    index = keyindex.open_index(args.log, first_only=args.first_only,
+                                cache=not args.no_cache)
+
+    if args.children is not None:
+        for child in index.children(args.children):
+            print child
+        return
+
+    if args.prefix is not None:
+        keys = index.prefix(args.prefix)
+    elif args.regex is not None:
+        keys = index.regex(args.regex)
+    elif args.pattern is not None:
+        keys = index.glob(args.pattern)
+    else:
+        keys = index.keys
+
+    for key in keys:
+        if args.ranges:
+            print "%s %s" % (key, format_ranges(index.dump_ranges(key)))
+        else:
+            print key
+
+if __name__ == "__main__":
+    main()
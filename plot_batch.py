@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Andreas Sandberg
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Andreas Sandberg
+
+
+from gem5stats import log
+from gem5stats import logquery
+from gem5stats import archive
+from gem5stats.util import BufferedISlice
+
+import sys
+import os
+import argparse
+import json
+import multiprocessing
+
+# Select a backend that doesn't need a display before pyplot is
+# imported by plot_ts.
+import matplotlib
+matplotlib.use("Agg")
+
+import plot_ts
+
+class Figure(object):
+    """One figure from a plot spec.
+
+    Attributes:
+      name -- Output file name.
+      title -- Title of the figure.
+      fun_x -- Expression tree for the x-axis.
+      fun_y -- List of expression trees for the y-axis.
+      x -- Values of fun_x for every dump.
+      y -- List of values of every fun_y for every dump.
+    """
+
+    def __init__(self, spec, default_x):
+        self.name = spec["file"]
+        self.title = spec.get("title", None)
+        self.fun_x = logquery.eval_fun(spec.get("x", default_x))
+        self.fun_y = [ logquery.eval_fun(f) for f in spec["y"] ]
+        self.x = []
+        self.y = [ list() for f in self.fun_y ]
+
+    def add(self, dump):
+        """Evaluate the figure's expressions on a dump."""
+        self.x.append(self.fun_x(dump))
+        for _y, fun_y in zip(self.y, self.fun_y):
+            _y.append(fun_y(dump))
+
+    def job(self, out_dir, fmt):
+        """Return the arguments to render_figure for this figure."""
+        kwargs = { "title" : self.title } if self.title else {}
+        return (os.path.join(out_dir, self.name), fmt,
+                self.x, self.y, str(self.fun_x),
+                [ str(f) for f in self.fun_y ], kwargs)
+
+def render_figure(job):
+    name, fmt, x, y, label_x, labels_y, kwargs = job
+    plt = plot_ts.render(x, y, label_x, labels_y, **kwargs)
+    plt.savefig(name, format=fmt)
+    plt.close("all")
+    return name
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Plot several figures from a gem5 log in one pass.')
+    parser.add_argument('log', metavar='LOG', type=argparse.FileType('r'),
+                        help='Log file')
+    parser.add_argument('spec', metavar='SPEC', type=argparse.FileType('r'),
+                        help='Plot spec (JSON)')
+
+    parser.add_argument('--x', metavar='FUN', type=str,
+                        default="LV('sim_insts')",
+                        help='Default function for the x-axis')
+
+    parser.add_argument('--save-fmt', metavar='FMT', type=str,
+                        default="pdf",
+                        help='Format of saved plots')
+
+    parser.add_argument('--out-dir', metavar='DIR', type=str, default=".",
+                        help='Directory to store plots in')
+
+    parser.add_argument("--jobs", "-j", metavar="N", type=int, default=None,
+                        help="Number of rendering processes")
+
+    parser.add_argument("--start", metavar="NUM", type=int, default=1,
+                        help="Skip the first NUM entries")
+
+    parser.add_argument("--stop", metavar="NUM", type=int, default=None,
+                        help="Stop after NUM entries")
+
+    parser.add_argument("--step", metavar="N", type=int, default=1,
+                        help="Use every N windows")
+
+    parser.add_argument("--mmap", action="store_true", default=False,
+                        help="Memory map the log and only parse the "
+                        "entries used by the queries")
+
+    args = parser.parse_args()
+
+    spec = json.load(args.spec)
+    figures = [ Figure(f, args.x) for f in spec["figures"] ]
+
+    if args.mmap and not archive.is_archive(args.log):
+        dumps = log.stream_mmap(args.log)
+    else:
+        dumps = archive.open_stream(args.log)
+
+    stream = BufferedISlice(dumps,
+                            start=args.start, stop=args.stop,
+                            step=args.step)
+    for step in stream:
+        if isinstance(step, tuple):
+            step = step[0]
+
+        for f in figures:
+            f.add(step)
+
+    if not os.path.isdir(args.out_dir):
+        os.makedirs(args.out_dir)
+
+    jobs = [ f.job(args.out_dir, args.save_fmt) for f in figures ]
+
+    pool = multiprocessing.Pool(args.jobs)
+    try:
+        for name in pool.imap_unordered(render_figure, jobs):
+            print name
+    finally:
+        pool.close()
+        pool.join()
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,8 @@
 
 from gem5stats import log
 from gem5stats import logquery
+from gem5stats import rebin
+from gem5stats import archive
 from gem5stats.util import BufferedISlice
 
 import sys
@@ -38,7 +40,7 @@ import argparse
 
 import matplotlib.pyplot as plt
 
-def plot(stream, fun_x, *args, **kwargs):
+def evaluate(stream, fun_x, *args):
     x = []
     y = [ list() for fun_y in args ]
     for step in stream:
@@ -49,18 +51,21 @@ def plot(stream, fun_x, *args, **kwargs):
         for _y, fun_y in zip(y, args):
             _y.append(fun_y(step))
 
+    return x, y
+
+def render(x, y, label_x, labels_y, **kwargs):
     fig = plt.figure()
     plt.hold(True)
     plt.xlim(x[0], x[-1])
     if 'title' in kwargs:
         plt.title(kwargs['title'])
 
-    plt.xlabel(str(fun_x))
+    plt.xlabel(label_x)
 
-    for fun_y, _y in zip(args, y):
+    for label_y, _y in zip(labels_y, y):
         plt.plot(x, _y,
                  '-+',
-                 label=str(fun_y),
+                 label=label_y,
                  drawstyle="steps-post")
 
     plt.legend()
@@ -68,6 +73,10 @@ def plot(stream, fun_x, *args, **kwargs):
 
     return plt
 
+def plot(stream, fun_x, *args, **kwargs):
+    x, y = evaluate(stream, fun_x, *args)
+    return render(x, y, str(fun_x), [ str(f) for f in args ], **kwargs)
+
 def main():
     parser = argparse.ArgumentParser(description='Plot a time series from a gem5 log.')
     parser.add_argument('log', metavar='LOG', type=argparse.FileType('r'),
@@ -96,6 +105,31 @@ def main():
     parser.add_argument("--step", metavar="N", type=int, default=1,
                         help="Use every N windows")
 
+    parser.add_argument("--rebin", metavar="TICKS", type=int, default=None,
+                        help="Merge dumps into intervals of TICKS "
+                        "simulated ticks")
+
+    parser.add_argument("--rebin-key", metavar="KEY", type=str,
+                        default="final_tick",
+                        help="Cumulative stat used to assign dumps to "
+                        "intervals")
+
+    parser.add_argument("--rebin-last", metavar="KEY", type=str,
+                        action="append", default=[],
+                        help="Take the last value of KEY (wildcards "
+                        "allowed) in an interval instead of summing "
+                        "it. May be repeated.")
+
+    parser.add_argument("--rebin-sum", metavar="KEY", type=str,
+                        action="append", default=[],
+                        help="Sum the values of KEY (wildcards allowed) "
+                        "in an interval even if they aren't integers. "
+                        "May be repeated.")
+
+    parser.add_argument("--mmap", action="store_true", default=False,
+                        help="Memory map the log and only parse the "
+                        "entries used by the query")
+
     args = parser.parse_args()
 
     fun_x = logquery.eval_fun(args.x)
@@ -103,7 +137,16 @@ def main():
     for fun in args.fun:
         fun_y.append(logquery.eval_fun(fun))
 
-    stream = BufferedISlice(log.stream_log(args.log),
+    if args.mmap and not archive.is_archive(args.log):
+        dumps = log.stream_mmap(args.log)
+    else:
+        dumps = archive.open_stream(args.log)
+    if args.rebin:
+        dumps = rebin.rebin(dumps, args.rebin, tick_key=args.rebin_key,
+                            last=rebin.default_last + tuple(args.rebin_last),
+                            sum=rebin.default_sum + tuple(args.rebin_sum))
+
+    stream = BufferedISlice(dumps,
                             start=args.start, stop=args.stop,
                             step=args.step)
 
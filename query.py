@@ -30,15 +30,81 @@
 
 from gem5stats import log
 from gem5stats import logquery
-from gem5stats.util import BufferedISlice
+from gem5stats import sqlstore
+from gem5stats import rebin
+from gem5stats import archive
+from gem5stats import resultcache
+from gem5stats import sampling
+from gem5stats import parallel
+from gem5stats.aggregate import RunningStats
+from gem5stats.util import BufferedISlice, CountingReader, fingerprint
+from gem5stats.checkpoint import Checkpoint
 import sys
 import os
 import argparse
+import itertools
+import copy
+
+def evaluate(stream, funs):
+    for step in stream:
+        if isinstance(step, tuple):
+            step = step[0]
+
+        yield [ f(step) for f in funs ]
+
+def track_offset(dumps, reader, offset):
+    """Store the file offset after every dump in offset[0].
+
+    The offset of the reader is only meaningful after a complete dump
+    has been read, which isn't the case once the stream has ended
+    since the log may end with a partially written dump.
+    """
+    for dump in dumps:
+        offset[0] = reader.offset
+        yield dump
+
+def open_dumps(args, log_file, where, offset=0):
+    """Open the stream of dumps selected by the command line.
+
+    Returns a (dumps, reader) tuple, where reader is the
+    CountingReader used to read a plain log or None.
+    """
+    reader = None
+    if log_file is not None:
+        log_file.seek(offset)
+
+    if args.db:
+        dumps = sqlstore.stream_db(sqlstore.connect(args.db), args.log)
+    elif archive.is_archive(log_file):
+        dumps = archive.stream_archive(log_file)
+    elif args.mmap or args.sample or args.sample_fraction:
+        # Skipped dumps are never parsed when the log is memory
+        # mapped. Rebinning reads every dump before sampling, which
+        # still works well since a memory mapped dump is parsed in a
+        # single pass when all of its entries are read.
+        dumps = log.stream_mmap(log_file)
+    else:
+        reader = CountingReader(log_file, offset=offset)
+        # Lazy dumps only parse the entries used by the predicate
+        # before a dump is discarded. Rebinning reads every entry
+        # before the predicate is applied, which makes eager parsing
+        # cheaper.
+        if where is not None and not args.rebin:
+            dumps = log.stream_lazy(reader)
+        else:
+            dumps = log.stream_log(reader)
+
+    if args.rebin:
+        dumps = rebin.rebin(dumps, args.rebin, tick_key=args.rebin_key,
+                            last=rebin.default_last + tuple(args.rebin_last),
+                            sum=rebin.default_sum + tuple(args.rebin_sum))
+
+    return dumps, reader
 
 def main():
     parser = argparse.ArgumentParser(description='Plot a time series from a gem5 log.')
-    parser.add_argument('log', metavar='LOG', type=argparse.FileType('r'),
-                        help='Log file')
+    parser.add_argument('log', metavar='LOG', type=str,
+                        help='Log file (run name if --db is used)')
     parser.add_argument('fun', metavar='FUN', type=str, nargs='+',
                         help='Function to plot')
     parser.add_argument('--fs', metavar='C', type=str,
@@ -57,29 +123,255 @@ def main():
     parser.add_argument("--step", metavar="N", type=int, default=1,
                         help="Use every N windows")
 
+    parser.add_argument("--resume", metavar="FILE", type=str, default=None,
+                        help="Resume evaluation from a checkpoint and "
+                        "store a new checkpoint when done. Only dumps "
+                        "added since the checkpoint was created are "
+                        "evaluated.")
+
+    parser.add_argument("--rebin", metavar="TICKS", type=int, default=None,
+                        help="Merge dumps into intervals of TICKS "
+                        "simulated ticks")
+
+    parser.add_argument("--rebin-key", metavar="KEY", type=str,
+                        default="final_tick",
+                        help="Cumulative stat used to assign dumps to "
+                        "intervals")
+
+    parser.add_argument("--rebin-last", metavar="KEY", type=str,
+                        action="append", default=[],
+                        help="Take the last value of KEY (wildcards "
+                        "allowed) in an interval instead of summing "
+                        "it. May be repeated.")
+
+    parser.add_argument("--rebin-sum", metavar="KEY", type=str,
+                        action="append", default=[],
+                        help="Sum the values of KEY (wildcards allowed) "
+                        "in an interval even if they aren't integers. "
+                        "May be repeated.")
+
+    parser.add_argument("--where", metavar="EXPR", type=str, default=None,
+                        help="Only evaluate dumps where EXPR is true "
+                        "(e.g., \"LV('system.cpu.numCycles') > 0\"). "
+                        "--start, --stop, and --step count matching dumps.")
+
+    parser.add_argument("--sample", metavar="N", type=int, default=None,
+                        help="Approximate the query by only evaluating "
+                        "the last dump in every group of N dumps")
+
+    parser.add_argument("--sample-fraction", metavar="P", type=float,
+                        default=None,
+                        help="Approximate the query by evaluating a random "
+                        "fraction P of the dumps")
+
+    parser.add_argument("--seed", metavar="SEED", type=int, default=None,
+                        help="Random seed for --sample-fraction")
+
+    parser.add_argument("--confidence", metavar="P", type=float, default=0.95,
+                        choices=(0.90, 0.95, 0.99),
+                        help="Confidence level of the confidence intervals "
+                        "reported when sampling")
+
+    parser.add_argument("--jobs", "-j", metavar="N", type=int, default=None,
+                        help="Load the stats used by the queries into "
+                        "shared memory and evaluate the queries using N "
+                        "worker processes")
+
+    parser.add_argument("--mmap", action="store_true", default=False,
+                        help="Memory map the log and only parse the "
+                        "entries used by the query")
+
+    parser.add_argument("--cache", action="store_true", default=False,
+                        help="Load results from and store results in a "
+                        "disk cache")
+
+    parser.add_argument("--cache-dir", metavar="DIR", type=str, default=None,
+                        help="Cache directory (default: %s)" % \
+                            resultcache.default_dir())
+
+    parser.add_argument("--cache-size", metavar="MB", type=int, default=256,
+                        help="Maximum size of the cache in MB")
+
+    parser.add_argument("--cache-hash", action="store_true", default=False,
+                        help="Identify logs by a hash of their contents "
+                        "in addition to their size and modification time")
+
+    parser.add_argument("--db", metavar="DB", type=str, default=None,
+                        help="Evaluate the query on a run stored in a "
+                        "stats database (see export_db.py)")
+
     args = parser.parse_args()
 
     funs = []
     for fun in args.fun:
         funs.append(logquery.eval_fun(fun))
 
-    for no, fun in enumerate(funs):
-        print "# %i: %s" % (no, fun)
+    where = logquery.eval_fun(args.where) if args.where else None
+    trees = funs + [ where ] if where is not None else funs
+    queries = args.fun + [ args.where ] if where is not None \
+        else args.fun
+
+    start, stop = args.start, args.stop
+    cp = None
+    resumed = False
+    if args.db and args.resume:
+        parser.error("--resume can't be used with --db")
+
+    if args.rebin and args.resume:
+        parser.error("--resume can't be used with --rebin")
+
+    if args.mmap and args.resume:
+        parser.error("--resume can't be used with --mmap")
+
+    if args.cache and args.resume:
+        parser.error("--resume can't be used with --cache")
+
+    sample = args.sample or args.sample_fraction
+    if args.sample and args.sample_fraction:
+        parser.error("--sample can't be used with --sample-fraction")
+
+    if sample and (args.resume or args.cache):
+        parser.error("Sampling can't be used with --resume or --cache")
+
+    if args.jobs and (args.resume or sample):
+        parser.error("--jobs can't be used with --resume or sampling")
+
+    if args.db:
+        log_file = None
+    else:
+        log_file = open(args.log, "r")
+
+    if args.resume and archive.is_archive(log_file):
+        parser.error("--resume can't be used with stats archives")
+
+    if args.resume:
+        if args.step != 1 or (stop is not None and stop < 0):
+            parser.error("--resume doesn't support --step or negative --stop")
+
+        if os.path.exists(args.resume):
+            cp = Checkpoint.load(args.resume)
+            cp.validate(args.log, queries)
+            trees = cp.funs
+            funs = trees[:len(funs)]
+            where = trees[-1] if where is not None else None
+            resumed = True
+            log_file.seek(cp.offset)
+            start = max(start - cp.dumps, 0)
+            stop = max(stop - cp.dumps, 0) if stop is not None else None
+        else:
+            cp = Checkpoint(trees, queries)
+
+    # Rows from a resumed evaluation are meant to be appended to the
+    # output of the previous evaluation.
+    if not resumed or args.last:
+        for no, fun in enumerate(funs):
+            print "# %i: %s" % (no, fun)
+        if where is not None:
+            print "# where: %s" % where
 
-    out = []
+    out = cp.last if cp is not None and cp.last is not None else []
 
-    stream = BufferedISlice(log.stream_log(args.log),
-                            start=args.start, stop=args.stop,
+    cache = None
+    rows = []
+    if args.cache:
+        cache = resultcache.ResultCache(args.cache_dir,
+                                        args.cache_size << 20)
+        cache_key = resultcache.cache_key(
+            fingerprint(args.db if args.db else args.log,
+                        content_hash=args.cache_hash),
+            # The string representation of an expression tree
+            # doesn't include all of its parameters, use the queries
+            # from the command line instead.
+            args.fun,
+            run=args.log if args.db else None,
+            where=args.where,
+            start=start, stop=stop, step=args.step,
+            rebin=(args.rebin, args.rebin_key, tuple(args.rebin_last),
+                   tuple(args.rebin_sum)))
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if args.last:
+                print args.fs.join([ str(s) for s in
+                                     (cached[-1] if cached else []) ])
+            else:
+                for out in cached:
+                    print args.fs.join([ str(s) for s in out ])
+            return
+
+    dumps, reader = open_dumps(args, log_file, where,
+                               offset=cp.offset if cp else 0)
+    if cp is not None:
+        offset = [ cp.offset ]
+        dumps = track_offset(dumps, reader, offset)
+
+    sampler = None
+    if args.sample:
+        dumps = sampler = sampling.SystematicSampler(dumps, args.sample)
+    elif args.sample_fraction:
+        dumps = sampler = sampling.RandomSampler(dumps, args.sample_fraction,
+                                                 seed=args.seed)
+    sample_stats = [ RunningStats() for f in funs ]
+
+    if args.jobs and where is not None:
+        # Keep an unused copy of the predicate in case the dumps
+        # have to be read again.
+        initial_where = copy.deepcopy(where)
+
+    if where is not None:
+        dumps = itertools.ifilter(where, dumps)
+
+    consumed = cp.dumps if cp else 0
+    stream = BufferedISlice(dumps,
+                            start=start, stop=stop,
                             step=args.step)
-    for step in stream:
-        if isinstance(step, tuple):
-            step = step[0]
+    if args.jobs:
+        # The queries may use stats that they didn't use for the
+        # first dump, which are loaded by reading the dumps again.
+        def reopen():
+            dumps, reader = open_dumps(args, log_file, where)
+            if where is not None:
+                dumps = itertools.ifilter(copy.deepcopy(initial_where),
+                                          dumps)
+            return BufferedISlice(dumps,
+                                  start=start, stop=stop,
+                                  step=args.step)
+
+        results = parallel.evaluate(stream, funs, jobs=args.jobs,
+                                    reopen=reopen)
+    else:
+        results = evaluate(stream, funs)
 
-        out = [ f(step) for f in funs ]
+    for out in results:
+        if cache:
+            rows.append(out)
+        if sampler:
+            for s, value in zip(sample_stats, out):
+                try:
+                    s.add(float(value))
+                except (TypeError, ValueError):
+                    pass
         if not args.last:
             print args.fs.join([ str(s) for s in out ])
     if args.last:
         print args.fs.join([ str(s) for s in out ])
 
+    if cache:
+        cache.put(cache_key, rows)
+
+    if sampler:
+        print "# samples: %i of %i dumps" % (sampler.samples, sampler.total)
+        print "# mean: %s" % args.fs.join([ str(s.mean) if s.count else "nan"
+                                            for s in sample_stats ])
+        print "# ci: %s" % args.fs.join([
+                str(sampling.sample_ci(s, sampler.total, args.confidence))
+                for s in sample_stats ])
+
+    if cp is not None:
+        # Dumps skipped by --start have been consumed as well
+        consumed += stream.cur
+        cp.update(args.log, offset[0], consumed, out)
+        cp.save(args.resume)
+
 if __name__ == "__main__":
     main()